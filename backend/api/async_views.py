@@ -0,0 +1,106 @@
+"""Асинхронные представления частых запросов чтения для ASGI.
+
+Синхронные представления под ASGI Django 3.2 выполняет по очереди в одном
+общем потоке процесса. Здесь ответы из памяти процесса собираются прямо
+в цикле событий, а представления DRF с запросами к базе работают в пуле
+потоков и не ждут друг друга. Маршруты подключаются в backend/asgi_urls.py;
+под WSGI работают обычные представления.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from .authentication import credentials_known
+from .conditional import conditional_response, index_validators
+from .filters import IngredientFilter
+from .ingredient_index import ingredient_index
+from .urls import router
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def offload(func):
+    """func для вызова через await в пуле потоков.
+
+    Соединения с базой, открытые в потоке, закрываются после вызова;
+    с DB_POOL они возвращаются в пул соединений.
+    """
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(call, thread_sensitive=False)
+
+
+def async_view(view):
+    """Асинхронная обёртка представления DRF.
+
+    Чтение идёт в пуле потоков, ответ там же и сериализуется. Запись
+    выполняется, как и без обёртки, в общем потоке.
+    """
+    def read_and_render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    read = offload(read_and_render)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return wrapper
+
+
+def router_view(name):
+    return next(
+        pattern.callback for pattern in router.urls if pattern.name == name
+    )
+
+
+tag_list = async_view(router_view('tags-list'))
+recipe_list = async_view(router_view('recipes-list'))
+ingredient_list_view = async_view(router_view('ingredients-list'))
+
+
+def json_response(data):
+    response = HttpResponse(
+        JSONRenderer().render(data), content_type='application/json'
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+@wraps(ingredient_list_view)
+async def ingredient_list(request):
+    """Поиск продуктов по индексу в памяти без выхода из цикла событий.
+
+    Если индекс пора сверить с таблицей, токен нужно проверить по базе
+    или в индексе ничего не нашлось, запрос обслуживает представление DRF.
+    """
+    name = request.GET.get('name')
+    if (
+        request.method == 'GET' and name
+        and ingredient_index.is_fresh() and credentials_known(request)
+    ):
+        found = ingredient_index.search(
+            name,
+            contains=request.GET.get('match') == IngredientFilter.CONTAINS
+        )
+        if found:
+            return conditional_response(
+                request,
+                *index_validators(request, ingredient_index.snapshot[-1]),
+                lambda: json_response(found)
+            )
+    return await ingredient_list_view(request)
@@ -0,0 +1,162 @@
+"""Проверка токенов с кэшем пользователей в памяти процесса."""
+import copy
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authentication import (
+    TokenAuthentication, get_authorization_header
+)
+
+from recipes.models import UserChange
+from .cache import LRUCache
+
+# Журнал перечитывается с запасом: запись, вставленная в ещё не
+# зафиксированной транзакции или процессом с отстающими часами, видна
+# позже своего времени.
+CHANGES_OVERLAP = timedelta(seconds=10)
+
+
+class TokenCache(LRUCache):
+    """Токен → (пользователь, токен) с ограниченным временем жизни.
+
+    Вместо версии записи хранится момент, после которого она устаревает.
+    Пользователи, изменённые в других процессах, сбрасываются по журналу
+    UserChange: он перечитывается не чаще раза в refresh_interval секунд.
+    """
+
+    def __init__(self, max_size, ttl, refresh_interval):
+        super().__init__(max_size)
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.checked_at = None
+        self.since = None
+        self.pruned_at = 0
+        # id записей журнала, уже прочитанных в окне перекрытия.
+        self.seen = set()
+        # Растёт при каждом сбросе: запись, прочитанная из базы до сброса,
+        # не попадает в кэш.
+        self.generation = 0
+
+    def get(self, key, version=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, version=None):
+        super().set(key, value, time.monotonic() + self.ttl)
+
+    def forget_users(self, user_ids):
+        user_ids = set(user_ids)
+        with self.lock:
+            self.generation += 1
+            for key in [
+                key for key, (_, (user, _)) in self.entries.items()
+                if user.pk in user_ids
+            ]:
+                del self.entries[key]
+
+    def is_fresh(self):
+        """Журнал изменений перечитывать ещё рано."""
+        return (
+            self.checked_at is not None
+            and time.monotonic() - self.checked_at <= self.refresh_interval
+        )
+
+    def refresh(self, force=False):
+        """Сбросить пользователей, изменённых с прошлой проверки.
+
+        Без force журнал читается не чаще раза в refresh_interval секунд.
+        """
+        if not force and self.is_fresh():
+            return
+        now = time.monotonic()
+        since, self.since = self.since, timezone.now()
+        if self.checked_at is None or now - self.checked_at > self.ttl:
+            # Записи старше ttl устарели сами, журнал можно не читать.
+            with self.lock:
+                self.generation += 1
+                self.entries.clear()
+        else:
+            rows = dict(
+                UserChange.objects.filter(
+                    changed_at__gte=since - CHANGES_OVERLAP
+                ).values_list('pk', 'user_id')
+            )
+            # Записи окна перекрытия читаются повторно; пользователь
+            # сбрасывается только по новым.
+            changed = {
+                user_id for pk, user_id in rows.items() if pk not in self.seen
+            }
+            self.seen = set(rows)
+            if changed:
+                self.forget_users(changed)
+        self.checked_at = now
+        if now - self.pruned_at > self.ttl:
+            self.pruned_at = now
+            UserChange.objects.filter(
+                changed_at__lt=self.since - CHANGES_OVERLAP - timedelta(
+                    seconds=self.ttl
+                )
+            ).delete()
+
+
+token_cache = TokenCache(
+    settings.TOKEN_CACHE_SIZE,
+    settings.TOKEN_CACHE_TTL,
+    settings.TOKEN_CACHE_REFRESH,
+)
+
+
+def forget_users(user_ids):
+    """Сбросить пользователей в этом процессе и записать это в журнал."""
+    user_ids = list(user_ids)
+    token_cache.forget_users(user_ids)
+    UserChange.objects.bulk_create(
+        UserChange(user_id=user_id) for user_id in user_ids
+    )
+
+
+def credentials_known(request):
+    """Токен запроса можно проверить без обращения к базе.
+
+    True для запроса без заголовка Authorization и для известного токена,
+    пока журнал изменений перечитывать рано. Асинхронные представления
+    по нему решают, можно ли ответить из памяти, не пропустив ответ 401.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth:
+        return True
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return False
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return False
+    return token_cache.is_fresh() and token_cache.get(key) is not None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для известных токенов.
+
+    Выход, изменение, отключение и удаление пользователя, а также его
+    подписки видны всем процессам не позже чем через TOKEN_CACHE_REFRESH
+    секунд. Каждый запрос получает свою копию пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache.refresh()
+        cached = token_cache.get(key)
+        if cached is None:
+            generation = token_cache.generation
+            cached = super().authenticate_credentials(key)
+            if token_cache.generation == generation:
+                token_cache.set(key, cached)
+        user, token = cached
+        return copy.copy(user), token
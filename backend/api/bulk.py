@@ -0,0 +1,108 @@
+"""Создание рецептов пачкой."""
+from django.db import connection, transaction
+
+from recipes.counters import change_counters
+from recipes.images import schedule_variants
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+from .cache import recipe_ids
+from .fields import decode_images
+from .serializers import RecipeSerializer
+
+
+def collect_pks(items, get):
+    """Целые id из элементов пачки; остальное отсеет проверка."""
+    pks = set()
+    for item in items:
+        try:
+            pks.update(int(pk) for pk in get(item))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            pass
+    return pks
+
+
+def preload(items):
+    """Тэги и продукты всей пачки: два запроса вместо двух на рецепт."""
+    items = [item for item in items if isinstance(item, dict)]
+    return {
+        Tag: Tag.objects.in_bulk(
+            collect_pks(items, lambda item: item['tags'])
+        ),
+        Ingredient: Ingredient.objects.in_bulk(collect_pks(
+            items,
+            lambda item: [row['id'] for row in item['ingredients']]
+        )),
+    }
+
+
+def insert_recipes(author, recipes_data):
+    """Вставить проверенные рецепты несколькими запросами на всю пачку."""
+    if not recipes_data:
+        return []
+    recipes = [
+        Recipe(author=author, **{
+            field: value for field, value in data.items()
+            if field not in ('tags', 'recipe_ingredients')
+        })
+        for data in recipes_data
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            change_counters(Recipe, recipes, 1)
+            for recipe in recipes:
+                schedule_variants(recipe)
+            pks = [recipe.pk for recipe in recipes]
+            transaction.on_commit(lambda: recipe_ids.add(*pks))
+        else:
+            # SQLite не возвращает id строк вставки пачкой: рецепты
+            # вставляются по одному, счётчики, копии картинок и карта id
+            # обновляются в сигналах post_save.
+            for recipe in recipes:
+                recipe.save()
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+            for recipe, data in zip(recipes, recipes_data)
+            for tag in data['tags']
+        )
+        recipe_ingredients = RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe.pk,
+                ingredient=ingredient['id'],
+                amount=ingredient['amount'],
+            )
+            for recipe, data in zip(recipes, recipes_data)
+            for ingredient in data['recipe_ingredients']
+        )
+        change_counters(RecipeIngredient, recipe_ingredients, 1)
+    return recipes
+
+
+def create_recipes(items, author, context=None):
+    """Проверить и создать рецепты пачки.
+
+    Возвращает пары (рецепт, ошибки) в порядке элементов: ошибки в
+    одних рецептах не мешают создать остальные. Картинки декодируются
+    параллельно в процессах пула.
+    """
+    images = decode_images({
+        index: item['image'] for index, item in enumerate(items)
+        if isinstance(item, dict) and isinstance(item.get('image'), str)
+    })
+    context = {**(context or {}), 'found': preload(items)}
+    serializers = []
+    for index, item in enumerate(items):
+        if index in images:
+            item = {**item, 'image': images[index]}
+        serializer = RecipeSerializer(data=item, context=context)
+        serializer.is_valid()
+        serializers.append(serializer)
+    recipes = iter(insert_recipes(author, [
+        serializer.validated_data for serializer in serializers
+        if not serializer.errors
+    ]))
+    return [
+        (None, serializer.errors) if serializer.errors
+        else (next(recipes), None)
+        for serializer in serializers
+    ]
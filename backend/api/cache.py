@@ -0,0 +1,234 @@
+"""Кэши в памяти процесса."""
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Count, Max, prefetch_related_objects
+
+from recipes.models import Recipe, RecipeQuerySet, Tag
+
+
+class LRUCache:
+    """Ограниченный по размеру кэш с вытеснением давно неиспользуемых.
+
+    Каждая запись хранится вместе с версией: get возвращает значение,
+    только если версия совпадает с сохранённой.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def contains(self, key, version=None):
+        """Проверка без учёта в статистике и без изменения порядка."""
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] == version
+
+    def set(self, key, value, version=None):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (version, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+        }
+
+
+# Представление рецепта без полей, зависящих от пользователя.
+recipe_cache = LRUCache(settings.RECIPE_CACHE_SIZE)
+
+
+def recipe_cache_version(recipe, request):
+    """Версия записи: время изменения рецепта и адрес сайта для ссылок."""
+    return (
+        recipe.updated_at,
+        request.build_absolute_uri('/') if request else None,
+    )
+
+
+def prefetch_uncached_recipes(recipes, request):
+    """Подгрузить тэги и продукты только для рецептов, которых нет в кэше."""
+    prefetch_related_objects(
+        [
+            recipe for recipe in recipes
+            if not recipe_cache.contains(
+                recipe.pk, recipe_cache_version(recipe, request)
+            )
+        ],
+        *RecipeQuerySet.prefetch_lookups
+    )
+
+
+class TableSnapshot(ABC):
+    """Снимок небольшой таблицы-справочника в памяти процесса.
+
+    Снимок загружается при первом обращении и заменяется целиком,
+    поэтому читатели никогда не видят частично построенные данные.
+    Он считается устаревшим после изменения таблицы в этом процессе
+    (сигналы) и перепроверяется по состоянию таблицы не чаще раза в
+    refresh_interval секунд — так видны изменения из других процессов
+    и массовые загрузки без сигналов.
+    """
+
+    model = None
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self.snapshot = None
+        self.checked_at = 0
+        self.stale = True
+
+    def table_state(self):
+        state = self.model.objects.aggregate(
+            count=Count('pk'), last_modified=Max('updated_at')
+        )
+        return state['count'], state['last_modified']
+
+    @abstractmethod
+    def load(self, state):
+        """Построить self.snapshot, последним элементом которого идёт state."""
+
+    def refresh(self):
+        """Обновить снимок, если он устарел. Возвращает его состояние."""
+        now = time.monotonic()
+        if (
+            self.snapshot is None or self.stale
+            or now - self.checked_at > self.refresh_interval
+        ):
+            self.stale = False
+            self.checked_at = now
+            state = self.table_state()
+            if self.snapshot is None or self.snapshot[-1] != state:
+                self.load(state)
+        return self.snapshot[-1]
+
+    def is_fresh(self):
+        """Снимок можно читать без refresh(), то есть без запроса к базе."""
+        return (
+            self.snapshot is not None and not self.stale
+            and time.monotonic() - self.checked_at <= self.refresh_interval
+        )
+
+    def invalidate(self):
+        self.stale = True
+
+
+class TagMap(TableSnapshot):
+    """Соответствие slug тэга его id."""
+
+    model = Tag
+
+    def load(self, state):
+        self.snapshot = (
+            dict(Tag.objects.values_list('slug', 'id')),
+            state,
+        )
+
+    def ids(self, slugs):
+        """id тэгов по slug; неизвестные slug пропускаются."""
+        self.refresh()
+        ids_by_slug = self.snapshot[0]
+        return [ids_by_slug[slug] for slug in slugs if slug in ids_by_slug]
+
+
+tag_map = TagMap(settings.TAG_MAP_REFRESH)
+
+
+class RecipeIds(TableSnapshot):
+    """Битовая карта id существующих рецептов.
+
+    По ней короткие ссылки переходят на рецепт без запросов к базе.
+    Рецепты этого процесса отмечаются сигналами сразу; таблица
+    перепроверяется по числу строк и наибольшему id. Id, которого нет в
+    карте (рецепт из другого процесса), проверяется запросом.
+    """
+
+    model = Recipe
+
+    def __init__(self, refresh_interval):
+        super().__init__(refresh_interval)
+        self.lock = Lock()
+
+    def table_state(self):
+        state = Recipe.objects.aggregate(count=Count('pk'), last=Max('pk'))
+        return state['count'], state['last']
+
+    def load(self, state):
+        bits = bytearray((state[1] or 0) // 8 + 1)
+        for pk in Recipe.objects.order_by().values_list(
+            'pk', flat=True
+        ).iterator(chunk_size=10000):
+            bits[pk >> 3] |= 1 << (pk & 7)
+        self.snapshot = (bits, state)
+
+    def contains(self, pk):
+        self.refresh()
+        return self.in_snapshot(pk)
+
+    def in_snapshot(self, pk):
+        """Есть ли pk в карте, без сверки с таблицей."""
+        bits = self.snapshot[0]
+        return pk >> 3 < len(bits) and bool(bits[pk >> 3] & 1 << (pk & 7))
+
+    def exists(self, pk):
+        if self.contains(pk):
+            return True
+        if not Recipe.objects.filter(pk=pk).exists():
+            return False
+        self.add(pk)
+        return True
+
+    def add(self, *pks):
+        if self.snapshot is None:
+            return
+        with self.lock:
+            bits = self.snapshot[0]
+            for pk in pks:
+                if pk >> 3 >= len(bits):
+                    bits.extend(bytes((pk >> 3) + 1 - len(bits)))
+                bits[pk >> 3] |= 1 << (pk & 7)
+
+    def discard(self, pk):
+        if self.snapshot is None:
+            return
+        with self.lock:
+            bits = self.snapshot[0]
+            if pk >> 3 < len(bits):
+                bits[pk >> 3] &= ~(1 << (pk & 7)) & 0xFF
+
+
+recipe_ids = RecipeIds(settings.RECIPE_IDS_REFRESH)
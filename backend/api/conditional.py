@@ -0,0 +1,113 @@
+"""Условные GET-запросы: ETag, Last-Modified и ответ 304."""
+import hashlib
+from calendar import timegm
+from functools import partial
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from recipes.models import Recipe
+from .follows import followed_ids
+
+
+def make_etag(*parts):
+    return '"{}"'.format(
+        hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    )
+
+
+def conditional_response(request, etag, last_modified, build_response):
+    """Ответить 304, если клиентская копия актуальна, иначе собрать ответ.
+
+    build_response вызывается только при изменившихся данных, поэтому
+    сериализатор не запускается для актуальных копий.
+    """
+    timestamp = (
+        timegm(last_modified.utctimetuple()) if last_modified else None
+    )
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    ) or build_response()
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def table_validators(request, model):
+    """Валидаторы справочника по числу строк и последнему изменению."""
+    state = model.objects.aggregate(
+        count=Count('pk'), last_modified=Max('updated_at')
+    )
+    return (
+        make_etag(
+            model._meta.label, state['count'], state['last_modified'],
+            request.build_absolute_uri()
+        ),
+        state['last_modified'],
+    )
+
+
+def recipe_validators(request, pk):
+    """Валидаторы рецепта с учётом флагов текущего пользователя.
+
+    Для авторизованных пользователей Last-Modified не отдаётся: флаги
+    избранного, корзины и подписки меняются без отметки времени, и
+    сравнивать их можно только через ETag.
+    """
+    state = Recipe.objects.with_user_flags(request.user).filter(
+        pk=pk
+    ).values(
+        'updated_at', 'author_id', 'is_favorited', 'is_in_shopping_cart'
+    ).first()
+    if state is None:
+        return None, None
+    if not request.user.is_authenticated:
+        return (
+            make_etag(pk, state['updated_at'], request.build_absolute_uri()),
+            state['updated_at'],
+        )
+    is_subscribed = state['author_id'] in followed_ids(request)
+    return (
+        make_etag(
+            pk, state['updated_at'], request.build_absolute_uri(),
+            request.user.pk, state['is_favorited'],
+            state['is_in_shopping_cart'], is_subscribed
+        ),
+        None,
+    )
+
+
+def index_validators(request, state):
+    """Валидаторы ответа из индекса в памяти по состоянию его снимка."""
+    count, last_modified = state
+    return (
+        make_etag(
+            'ingredient-index', count, last_modified,
+            request.build_absolute_uri()
+        ),
+        last_modified,
+    )
+
+
+class TableConditionalMixin:
+    """304 для справочников, которые меняются редко (тэги, продукты)."""
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request, *table_validators(request, self.queryset.model),
+            partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, *table_validators(request, self.queryset.model),
+            partial(super().retrieve, request, *args, **kwargs)
+        )
+
+
+def vary_by_user(response):
+    patch_vary_headers(response, ('Authorization',))
+    response['Cache-Control'] = 'private, no-cache'
+    return response
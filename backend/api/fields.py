@@ -0,0 +1,190 @@
+"""Поле картинки в base64, которое не держит файл целиком в памяти."""
+import binascii
+import os
+import re
+import tempfile
+import uuid
+import weakref
+from collections import namedtuple
+
+import filetype
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields import fields
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from recipes.images import get_process_pool
+
+# Символов base64 в порции; кратно 4, чтобы порции декодировались отдельно.
+CHUNK_SIZE = 256 * 1024
+NOT_BASE64 = re.compile(rb'[^A-Za-z0-9+/=]')
+# Сколько байт начала файла нужно filetype для определения формата.
+HEAD_SIZE = 262
+
+# Картинка, заранее декодированная во временный файл (см. decode_images).
+DecodedImage = namedtuple('DecodedImage', 'path head')
+
+
+def decode_base64(data, start, file):
+    """Декодировать data[start:] порциями в file, вернуть начало файла."""
+    head = b''
+    rest = b''
+    for offset in range(start, len(data), CHUNK_SIZE):
+        chunk = rest + NOT_BASE64.sub(
+            b'', data[offset:offset + CHUNK_SIZE].encode('ascii')
+        )
+        size = len(chunk) // 4 * 4
+        chunk, rest = chunk[:size], chunk[size:]
+        decoded = binascii.a2b_base64(chunk)
+        if len(head) < HEAD_SIZE:
+            head += decoded[:HEAD_SIZE - len(head)]
+        file.write(decoded)
+    if rest:
+        raise binascii.Error('Incorrect padding')
+    return head
+
+
+def payload_start(data):
+    """Начало данных base64 в строке: после заголовка data:...;base64,"""
+    start = data.find(';base64,')
+    return 0 if start < 0 else start + len(';base64,')
+
+
+def decoded_size(data, start):
+    return (len(data) - start) * 3 // 4
+
+
+def decode_to_file(data, start, directory=None):
+    """Декодировать data[start:] во временный файл: (путь, начало файла).
+
+    Не зависит от настроек и запроса, поэтому выполняется и в процессах
+    пула картинок.
+    """
+    file = tempfile.NamedTemporaryFile(
+        suffix='.upload', dir=directory, delete=False
+    )
+    try:
+        with file:
+            head = decode_base64(data, start, file)
+    except Exception:
+        os.remove(file.name)
+        raise
+    return DecodedImage(file.name, head)
+
+
+def decode_images(images):
+    """Декодировать картинки пачки параллельно в процессах пула.
+
+    images — {ключ: строка base64}. Возвращает {ключ: DecodedImage}
+    для декодированных картинок; остальные поле декодирует само и
+    сообщит об ошибке. Строки слишком больших картинок не передаются.
+    """
+    if settings.IMAGE_WORKERS <= 0 or len(images) < 2:
+        return {}
+    pool = get_process_pool()
+    futures = {}
+    for key, data in images.items():
+        start = payload_start(data)
+        if decoded_size(data, start) <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            futures[key] = pool.submit(
+                decode_to_file, data, start, settings.FILE_UPLOAD_TEMP_DIR
+            )
+    decoded = {}
+    for key, future in futures.items():
+        try:
+            decoded[key] = future.result()
+        except (binascii.Error, UnicodeEncodeError):
+            pass
+    return decoded
+
+
+def remove_quietly(file, path):
+    file.close()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Base64Upload(UploadedFile):
+    """Декодированная картинка во временном файле.
+
+    Хранилище переносит временный файл на место, не копируя его; если
+    картинка так и не сохранилась, файл удаляется вместе с объектом.
+    """
+
+    def __init__(self, path):
+        super().__init__(
+            open(path, 'rb'), name=str(uuid.uuid4()),
+            size=os.path.getsize(path)
+        )
+        self.path = path
+        self.remove = weakref.finalize(self, remove_quietly, self.file, path)
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        self.remove()
+
+
+class Base64ImageField(fields.Base64ImageField):
+    """Картинка в base64, которая декодируется порциями во временный файл.
+
+    Размер файла проверяется до декодирования, а размеры картинки — по
+    заголовку файла, без декодирования точек. Ограничения задаются
+    настройками IMAGE_UPLOAD_MAX_SIZE и IMAGE_UPLOAD_MAX_PIXELS.
+    Вместо строки принимается и DecodedImage из decode_images.
+    """
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if isinstance(base64_data, DecodedImage):
+            decoded = base64_data
+        elif isinstance(base64_data, str):
+            decoded = self.decode(base64_data)
+        else:
+            return super().to_internal_value(base64_data)
+        upload = Base64Upload(decoded.path)
+        try:
+            self.check_image(upload, decoded.head)
+        except ValidationError:
+            upload.close()
+            raise
+        return super(fields.Base64FieldMixin, self).to_internal_value(upload)
+
+    def decode(self, base64_data):
+        start = payload_start(base64_data)
+        if decoded_size(base64_data, start) > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise ValidationError(
+                'Размер картинки больше '
+                f'{settings.IMAGE_UPLOAD_MAX_SIZE / 1024 / 1024:g} МБ.'
+            )
+        try:
+            return decode_to_file(
+                base64_data, start, settings.FILE_UPLOAD_TEMP_DIR
+            )
+        except (binascii.Error, UnicodeEncodeError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+
+    def check_image(self, upload, head):
+        """Проверить формат и размеры картинки по заголовку файла."""
+        try:
+            with Image.open(upload.temporary_file_path()) as image:
+                width, height = image.size
+                extension = filetype.guess_extension(head) or (
+                    image.format.lower()
+                )
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            raise ValidationError(
+                f'Картинка {width}×{height} слишком большая: допустимо '
+                f'не больше {settings.IMAGE_UPLOAD_MAX_PIXELS} точек.'
+            )
+        upload.name = f'{upload.name}.{extension}'
@@ -1,13 +1,27 @@
+from django import forms
+from django.db.models import BooleanField, Case, Exists, OuterRef, Value, When
 from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe
+from .cache import tag_map
+
+
+class MultipleValueField(forms.Field):
+    """Все значения повторяющегося параметра: ?tags=a&tags=b."""
+
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [item for item in value or () if item]
+
+
+class MultipleValueFilter(filters.Filter):
+    field_class = MultipleValueField
 
 
 class RecipeFilter(FilterSet):
     author = filters.CharFilter()
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug', lookup_expr='contains'
-    )
+    tags = MultipleValueFilter(method='filter_tags')
     is_favorited = filters.BooleanFilter(
         field_name='is_favorited',
         method='filter_is_favorited'
@@ -16,10 +30,30 @@ class RecipeFilter(FilterSet):
         field_name='is_in_shopping_cart',
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'search'
+        ]
+
+    def filter_tags(self, recipes, name, slugs):
+        """Рецепты хотя бы с одним из тэгов.
+
+        slug переводятся в id по кэшу тэгов, а EXISTS по таблице связей
+        не размножает рецепты с несколькими подходящими тэгами.
+        """
+        if not slugs:
+            return recipes
+        tag_ids = tag_map.ids(slugs)
+        if not tag_ids:
+            return recipes.none()
+        return recipes.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+            )
+        ))
 
     def filter_is_favorited(self, recipes, name, value):
         if self.request.user.is_authenticated and value:
@@ -31,10 +65,34 @@ class RecipeFilter(FilterSet):
             return recipes.filter(shoppingcarts__user=self.request.user)
         return recipes
 
+    def filter_search(self, recipes, name, value):
+        return recipes.search(value)
+
 
 class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
+    PREFIX = 'prefix'
+    CONTAINS = 'contains'
+
+    name = filters.CharFilter(method='filter_name')
+    match = filters.ChoiceFilter(
+        choices=((PREFIX, 'Начало названия'), (CONTAINS, 'Вхождение')),
+        method='filter_match'
+    )
 
     class Meta:
         model = Ingredient
-        fields = ('name', )
+        fields = ('name', 'match')
+
+    def filter_name(self, ingredients, name, value):
+        if self.data.get('match') != self.CONTAINS:
+            return ingredients.filter(name__istartswith=value)
+        return ingredients.filter(name__icontains=value).annotate(
+            is_prefix=Case(
+                When(name__istartswith=value, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        ).order_by('-is_prefix', 'name')
+
+    def filter_match(self, ingredients, name, value):
+        return ingredients
@@ -0,0 +1,39 @@
+"""Подписки автора запроса для поля is_subscribed."""
+from django.conf import settings
+
+from recipes.models import Subscription
+from .cache import LRUCache
+
+# id авторов, на которых подписан пользователь, по id пользователя.
+follow_cache = LRUCache(settings.FOLLOW_CACHE_SIZE)
+
+
+def followed_ids(request):
+    """Множество id авторов, на которых подписан автор запроса.
+
+    Загружается один раз за запрос, а между запросами хранится в
+    follow_cache. Версия записи — счётчик subscriptions_version
+    пользователя, который меняется при каждой подписке и отписке,
+    поэтому кэш других процессов устаревает сам.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(request, 'followed_ids', None)
+    if ids is None:
+        ids = follow_cache.get(user.pk, user.subscriptions_version)
+        if ids is None:
+            ids = frozenset(
+                Subscription.objects.filter(
+                    subscriber=user
+                ).values_list('subscribed_to_id', flat=True)
+            )
+            follow_cache.set(user.pk, ids, user.subscriptions_version)
+        request.followed_ids = ids
+    return ids
+
+
+def forget_followed_ids(request):
+    """Сбросить подписки после их изменения в текущем запросе."""
+    follow_cache.delete(request.user.pk)
+    request.followed_ids = None
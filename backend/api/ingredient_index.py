@@ -0,0 +1,50 @@
+"""Поиск продуктов по названию в памяти процесса."""
+from bisect import bisect_left
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+from .cache import TableSnapshot
+
+
+class IngredientIndex(TableSnapshot):
+    """Отсортированный массив названий продуктов для поиска по префиксу."""
+
+    model = Ingredient
+
+    def load(self, state):
+        rows = sorted(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit'),
+            key=lambda row: (row[1].casefold(), row[0])
+        )
+        self.snapshot = (
+            [name.casefold() for _, name, _ in rows],
+            [
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for pk, name, unit in rows
+            ],
+            state,
+        )
+
+    def search(self, text, contains=False):
+        """Продукты, название которых начинается с text.
+
+        С contains=True добавляются и совпадения внутри названия —
+        после совпадений по началу.
+        """
+        keys, rows, _ = self.snapshot
+        text = text.casefold()
+        start = bisect_left(keys, text)
+        end = start
+        while end < len(keys) and keys[end].startswith(text):
+            end += 1
+        found = rows[start:end]
+        if contains:
+            found = found + [
+                row for key, row in zip(keys, rows)
+                if text in key and not key.startswith(text)
+            ]
+        return found
+
+
+ingredient_index = IngredientIndex(settings.INGREDIENT_INDEX_REFRESH)
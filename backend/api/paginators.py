@@ -1,6 +1,128 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class PageLimitPaginator(PageNumberPagination):
+    """Постраничная пагинация с необязательным режимом курсора.
+
+    По умолчанию работает как раньше (page/limit). Если в запросе есть
+    параметр cursor (в том числе пустой — первая страница), выборка
+    идёт по ключу из полей cursor_ordering представления без OFFSET и
+    COUNT(*): время ответа не зависит от глубины страницы.
+    """
+
     page_size_query_param = 'limit'
     page_size = 6
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-published_at', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.ordering = getattr(
+            view, 'cursor_ordering', self.cursor_ordering
+        )
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+        self.descending = self.ordering[0].startswith('-')
+        page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(
+                self.seek(queryset, values, reverse)
+            )
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+        self.next_values = self.previous_values = None
+        if rows and (has_more or reverse):
+            self.next_values = self.position(rows[-1])
+        if rows and (has_more if reverse else values is not None):
+            self.previous_values = self.position(rows[0])
+        return rows
+
+    def seek(self, queryset, values, reverse):
+        """Условие (f1, f2, ...) < (v1, v2, ...), которое использует индекс."""
+        connection = connections[queryset.db]
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = ', '.join(
+            f'{table}.{connection.ops.quote_name(field.column)}'
+            for field in self.fields
+        )
+        placeholders = ', '.join('%s' for _ in self.fields)
+        operator = '<' if self.descending != reverse else '>'
+        return RawSQL(
+            f'({columns}) {operator} ({placeholders})',
+            [
+                field.get_db_prep_value(value, connection)
+                for field, value in zip(self.fields, values)
+            ],
+            output_field=BooleanField(),
+        )
+
+    def position(self, instance):
+        return [field.value_to_string(instance) for field in self.fields]
+
+    def encode_cursor(self, values, reverse=False):
+        return base64.urlsafe_b64encode(
+            json.dumps({'v': values, 'r': reverse}).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(data['v']) != len(self.fields):
+                raise ValueError
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.fields, data['v'])
+            ]
+            return values, bool(data['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_link(self, values, reverse):
+        if values is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(values, reverse)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.cursor_link(self.next_values, False),
+            'previous': self.cursor_link(self.previous_values, True),
+            'results': data,
+        })
@@ -0,0 +1,51 @@
+"""Разбор тела запроса с ограничением размера."""
+from django.conf import settings
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+
+class RequestTooLarge(APIException):
+    status_code = 413
+    default_detail = 'Тело запроса слишком большое.'
+    default_code = 'request_too_large'
+
+
+class LimitedJSONParser(JSONParser):
+    """JSON не больше settings.JSON_BODY_MAX_SIZE байт.
+
+    Стандартный парсер читает тело любого размера целиком, а картинки
+    приходят в теле в base64.
+    """
+
+    limit_setting = 'JSON_BODY_MAX_SIZE'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        limit = getattr(settings, self.limit_setting)
+        request = parser_context.get('request')
+        if request is not None and int(
+            request.META.get('CONTENT_LENGTH') or 0
+        ) > limit:
+            raise RequestTooLarge()
+        body = stream.read(limit + 1)
+        if len(body) > limit:
+            raise RequestTooLarge()
+        try:
+            # Байты тела освобождаются до разбора: в памяти одновременно
+            # не больше двух копий картинки в base64.
+            body = body.decode(
+                parser_context.get('encoding', settings.DEFAULT_CHARSET)
+            )
+            return json.loads(
+                body,
+                parse_constant=json.strict_constant if self.strict else None
+            )
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class BulkJSONParser(LimitedJSONParser):
+    """JSON пачки рецептов: не больше settings.RECIPE_BULK_BODY_MAX_SIZE."""
+
+    limit_setting = 'RECIPE_BULK_BODY_MAX_SIZE'
@@ -1,18 +1,48 @@
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
 
+from recipes import shopping_lists
+from recipes.constants import MAX_PK_VALUE
+from recipes.counters import change_counters, delete_counted
 from recipes.models import (
-    Favorite, Ingredient, RecipeIngredient, Recipe,
-    ShoppingCart, Tag, FoodgramUser
+    Ingredient, RecipeIngredient, Recipe, Tag, FoodgramUser
 )
+
+from .cache import recipe_cache, recipe_cache_version
+from .fields import Base64ImageField
+from .follows import followed_ids
 from .utils import get_ingredients_values
-from .validators import check_items
+from .validators import check_items, validate_recipes_limit
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Адреса уменьшенных копий: {вариант: {формат: адрес}}.
+
+    Пока копии строятся, значение — пустой словарь.
+    """
+
+    def to_representation(self, variants):
+        request = self.context.get('request')
+        return {
+            variant: {
+                image_format: (
+                    request.build_absolute_uri(default_storage.url(name))
+                    if request else default_storage.url(name)
+                )
+                for image_format, name in files.items()
+            }
+            for variant, files in variants.items()
+            if variant != 'source'
+        }
 
 
 class FoodgramUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField()
+    avatar_variants = ImageVariantsField()
 
     class Meta(UserSerializer.Meta):
         model = FoodgramUser
@@ -20,24 +50,23 @@ class FoodgramUserSerializer(UserSerializer):
             *UserSerializer.Meta.fields,
             'is_subscribed',
             'avatar',
+            'avatar_variants',
         )
 
     def get_is_subscribed(self, user):
-        request = self.context['request']
-        return (
-            request.user.is_authenticated
-            and request.user.authors.filter(
-                subscriber=user
-            ).exists()
-        )
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is None:
+            subscribed_ids = followed_ids(self.context['request'])
+        return user.pk in subscribed_ids
 
 
 class AvatarSerializer(serializers.ModelSerializer):
     avatar = Base64ImageField()
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = FoodgramUser
-        fields = ('avatar',)
+        fields = ('avatar', 'avatar_variants')
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -67,9 +96,8 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    # Продукты ищутся одним запросом в RecipeSerializer.validate_ingredients.
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
@@ -82,37 +110,38 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         many=True, source='recipe_ingredients'
     )
     tags = TagSerializer(many=True)
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'name', 'text',
-            'cooking_time', 'image', 'is_favorited', 'is_in_shopping_cart'
+            'cooking_time', 'image', 'image_variants', 'is_favorited',
+            'is_in_shopping_cart'
         )
         read_only_fields = ('__all__',)
 
-    def get_is_favorited(self, recipe):
-        request = self.context['request']
-        return (
-            request
-            and request.user.is_authenticated
-            and Favorite.objects.filter(
-                user=request.user,
-                recipe=recipe.id
-            ).exists()
-        )
-
-    def get_is_in_shopping_cart(self, obj):
-        request = self.context['request']
-        return (
-            request
-            and request.user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user=request.user, recipe=obj.id
-            ).exists()
-        )
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        version = recipe_cache_version(recipe, request)
+        data = recipe_cache.get(recipe.pk, version)
+        if data is None:
+            data = super().to_representation(recipe)
+            recipe_cache.set(recipe.pk, data, version)
+            return data
+        return {
+            **data,
+            'author': {
+                **data['author'],
+                'is_subscribed': self.fields['author'].get_is_subscribed(
+                    recipe.author
+                ),
+            },
+            'is_favorited': recipe.is_favorited,
+            'is_in_shopping_cart': recipe.is_in_shopping_cart,
+        }
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -121,9 +150,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientWriteSerializer(
         many=True, source='recipe_ingredients'
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
 
     class Meta:
         model = Recipe
@@ -140,7 +167,9 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return RecipeGetSerializer(
-            instance,
+            Recipe.objects.with_related().with_user_flags(
+                self.context['request'].user
+            ).get(pk=instance.pk),
             context=self.context
         ).data
 
@@ -153,20 +182,63 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         return data
 
+    def find(self, model, pks):
+        """Объекты по id одним запросом.
+
+        При проверке пачки рецептов объекты всей пачки заранее загружены
+        в context['found'][model].
+        """
+        found = self.context.get('found', {}).get(model)
+        return model.objects.in_bulk(pks) if found is None else found
+
+    @staticmethod
+    def does_not_exist(pk):
+        return serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ].format(pk_value=pk)
+
+    def validate_tags(self, tags):
+        """Заменить id тэгов объектами, найденными одним запросом."""
+        found = self.find(Tag, tags)
+        missing = [pk for pk in tags if pk not in found]
+        if missing:
+            raise serializers.ValidationError(
+                [self.does_not_exist(pk) for pk in missing]
+            )
+        return [found[pk] for pk in tags]
+
+    def validate_ingredients(self, ingredients):
+        """Заменить id продуктов объектами, найденными одним запросом."""
+        found = self.find(
+            Ingredient, [ingredient['id'] for ingredient in ingredients]
+        )
+        errors = [
+            {} if ingredient['id'] in found else {
+                'id': [self.does_not_exist(ingredient['id'])]
+            } for ingredient in ingredients
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for ingredient in ingredients:
+            ingredient['id'] = found[ingredient['id']]
+        return ingredients
+
     def validate_image(self, image):
         if not image:
             raise serializers.ValidationError('Это поле не может быть пустым')
         return image
 
     def create_ingredients(self, ingredients_data, recipe):
-        RecipeIngredient.objects.bulk_create(
+        recipe_ingredients = RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=recipe,
                 ingredient=ingredient['id'],
                 amount=ingredient['amount'],
             ) for ingredient in ingredients_data
         )
+        change_counters(RecipeIngredient, recipe_ingredients, 1)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredients')
         tags_data = validated_data.pop('tags')
@@ -174,32 +246,92 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags_data)
         self.create_ingredients(ingredients_data, recipe)
-
+        recipe_cache.delete(recipe.pk)
         return recipe
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Записать только разницу между старыми и новыми продуктами.
+
+        Удаление, вставка и смена количества — по одному запросу на всю
+        пачку, поэтому число запросов не зависит от числа продуктов.
+        """
+        rows = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        old = {pk: row.amount for pk, row in rows.items()}
+        new = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [row for pk, row in rows.items() if pk not in new]
+        changed = []
+        for pk, row in rows.items():
+            if pk in new and row.amount != new[pk]:
+                row.amount = new[pk]
+                changed.append(row)
+        delete_counted(RecipeIngredient, removed)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=pk, amount=amount)
+            for pk, amount in new.items() if pk not in rows
+        )
+        if added:
+            change_counters(RecipeIngredient, added, 1)
+        shopping_lists.change_recipe_ingredients(recipe.pk, old, new)
+
+    @staticmethod
+    def update_tags(recipe, tags):
+        through = Recipe.tags.through
+        old = set(
+            through.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
+            )
+        )
+        new = {tag.pk for tag in tags}
+        if old - new:
+            through.objects.filter(
+                recipe=recipe, tag_id__in=old - new
+            ).delete()
+        through.objects.bulk_create(
+            through(recipe=recipe, tag_id=pk) for pk in new - old
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('recipe_ingredients')
-        instance.ingredients.clear()
-        tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        self.create_ingredients(ingredients, recipe=instance)
+        self.update_ingredients(
+            instance, validated_data.pop('recipe_ingredients')
+        )
+        self.update_tags(instance, validated_data.pop('tags'))
+        recipe_cache.delete(instance.pk)
         return super().update(instance, validated_data)
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для изменения избранного или корзины пачкой."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_PK_VALUE),
+        allow_empty=False,
+        max_length=settings.RECIPE_BULK_MAX_SIZE,
+    )
+
+
 class DisplayRecipesSerializer(serializers.ModelSerializer):
     id = serializers.PrimaryKeyRelatedField(
         read_only=True
     )
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class DisplaySubscriptionSerializer(FoodgramUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(FoodgramUserSerializer.Meta):
         model = FoodgramUser
@@ -209,13 +341,32 @@ class DisplaySubscriptionSerializer(FoodgramUserSerializer):
             'recipes_count'
         )
 
-    def get_recipes_count(self, user):
-        return Recipe.objects.filter(
-            author=user).count()
-
     def get_recipes(self, author):
+        """Рецепты автора из context['recipes_by_author'].
+
+        Для списка подписок они загружаются заранее одним запросом на
+        всю страницу; для одного автора — отдельным запросом.
+        """
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is None:
+            recipes_by_author = recipes_by_authors(
+                [author.pk], self.context['request']
+            )
         return DisplayRecipesSerializer(
-            Recipe.objects.select_related('author')[:int(
-                self.context.get('request').GET.get('recipes_limit', 10**10)
-            )], many=True
+            recipes_by_author.get(author.pk, ()), many=True
         ).data
+
+
+def recipes_by_authors(author_ids, request):
+    """Последние рецепты авторов с учётом параметра recipes_limit."""
+    recipes_by_author = {}
+    for recipe in Recipe.objects.filter(
+        author_id__in=author_ids
+    ).only(
+        'id', 'author_id', 'name', 'image', 'image_variants', 'cooking_time',
+        'published_at'
+    ).latest_per_author(
+        validate_recipes_limit(request.query_params.get('recipes_limit'))
+    ):
+        recipes_by_author.setdefault(recipe.author_id, []).append(recipe)
+    return recipes_by_author
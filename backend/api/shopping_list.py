@@ -0,0 +1,172 @@
+"""Выгрузка списка покупок потоком в нескольких форматах."""
+import csv
+import io
+import json
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Value
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from recipes.models import Recipe, ShoppingListItem
+
+
+INGREDIENT, RECIPE = 0, 1
+
+
+def shopping_list_rows(user):
+    """Продукты из списка покупок пользователя, затем названия рецептов.
+
+    Суммы уже посчитаны в ShoppingListItem, поэтому это одно чтение по
+    индексу (UNION с рецептами), которое идёт итератором и не держит
+    весь список в памяти.
+    """
+    ingredients = ShoppingListItem.objects.filter(
+        user=user
+    ).order_by().annotate(
+        title=F('ingredient__name'),
+        unit=F('ingredient__measurement_unit'),
+        total=F('amount'),
+        kind=Value(INGREDIENT, output_field=IntegerField()),
+    ).values_list('title', 'unit', 'total', 'kind')
+    recipes = Recipe.objects.filter(
+        shoppingcarts__user=user
+    ).order_by().annotate(
+        title=F('name'),
+        unit=Value(''),
+        total=Value(0, output_field=IntegerField()),
+        kind=Value(RECIPE, output_field=IntegerField()),
+    ).values_list('title', 'unit', 'total', 'kind')
+    return ingredients.union(recipes, all=True).order_by(
+        'kind', 'title'
+    ).iterator()
+
+
+def text_lines(rows):
+    yield (
+        f'Список покупок от {datetime.now().strftime("%d-%m-%Y %H:%M")}.'
+    )
+    yield ''
+    yield 'Купить:'
+    index = 0
+    recipes_started = False
+    for title, unit, total, kind in rows:
+        if kind == RECIPE:
+            if not recipes_started:
+                yield ''
+                yield 'Для рецептов:'
+                recipes_started = True
+            yield title
+            continue
+        index += 1
+        yield f'{index}. {title.capitalize()} - {total}({unit}).'
+    if not recipes_started:
+        yield ''
+        yield 'Для рецептов:'
+
+
+def render_txt(rows):
+    for line in text_lines(rows):
+        yield f'{line}\n'
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        ('section', 'name', 'measurement_unit', 'amount')
+    )
+    for title, unit, total, kind in rows:
+        if kind == RECIPE:
+            yield writer.writerow(('recipe', title, '', ''))
+        else:
+            yield writer.writerow(('ingredient', title, unit, total))
+
+
+def render_json(rows):
+    yield '{"created": %s, "ingredients": [' % json.dumps(
+        datetime.now().isoformat(timespec='seconds')
+    )
+    separator = ''
+    section = INGREDIENT
+    for title, unit, total, kind in rows:
+        if kind == RECIPE and section == INGREDIENT:
+            yield '], "recipes": ['
+            separator, section = '', RECIPE
+        if kind == RECIPE:
+            item = title
+        else:
+            item = {'name': title, 'measurement_unit': unit, 'amount': total}
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ', '
+    if section == INGREDIENT:
+        yield '], "recipes": ['
+    yield ']}'
+
+
+PDF_FONT = 'ShoppingList'
+
+
+@lru_cache(maxsize=None)
+def pdf_font():
+    """Шрифт с кириллицей из SHOPPING_LIST_FONT, встраиваемый в PDF.
+
+    Регистрируется один раз на процесс; если файла нет, используется
+    Helvetica, в которой кириллицы нет.
+    """
+    try:
+        pdfmetrics.registerFont(TTFont(PDF_FONT, settings.SHOPPING_LIST_FONT))
+    except (OSError, TTFError):
+        return 'Helvetica'
+    return PDF_FONT
+
+
+def render_pdf(rows, font_size=12, margin=56):
+    """PDF с текстом, который можно выделить и найти поиском.
+
+    reportlab собирает документ целиком, поэтому он отдаётся одной
+    частью; на странице около 45 строк, и даже длинный список занимает
+    в памяти сотни килобайт.
+    """
+    buffer = io.BytesIO()
+    canvas = Canvas(buffer, pagesize=A4, pageCompression=1)
+    canvas.setTitle('Список покупок')
+    font = pdf_font()
+    page_width, page_height = A4
+    line_height = font_size * 1.5
+    lines_per_page = int((page_height - 2 * margin) // line_height)
+    line = 0
+    canvas.setFont(font, font_size)
+    for text in text_lines(rows):
+        for part in simpleSplit(
+            text, font, font_size, page_width - 2 * margin
+        ) or ['']:
+            if line == lines_per_page:
+                canvas.showPage()
+                canvas.setFont(font, font_size)
+                line = 0
+            line += 1
+            canvas.drawString(
+                margin, page_height - margin - line * line_height, part
+            )
+    canvas.save()
+    yield buffer.getvalue()
+
+
+FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'json': (render_json, 'application/json'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
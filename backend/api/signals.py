@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models import Subquery
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    FoodgramUser, Ingredient, Recipe, Subscription, Tag
+)
+from .authentication import forget_users
+from .cache import recipe_cache, recipe_ids, tag_map
+from .ingredient_index import ingredient_index
+from .serializers import FoodgramUserSerializer
+
+# Поля автора, которые попадают в закэшированное представление рецепта.
+AUTHOR_FIELDS = frozenset(FoodgramUserSerializer.Meta.fields) - {
+    'is_subscribed'
+}
+
+
+def touch_recipes(recipes):
+    """Сменить версию рецептов, чтобы кэш во всех процессах устарел."""
+    recipe_cache.delete(*recipes.values_list('pk', flat=True))
+    recipes.update(updated_at=timezone.now())
+
+
+def touch_table(model):
+    """Отметить удаление строки справочника для валидаторов Last-Modified.
+
+    Время изменения получает самая свежая из оставшихся строк, иначе
+    после удаления If-Modified-Since продолжал бы отвечать 304.
+    """
+    model.objects.filter(pk=Subquery(
+        model.objects.order_by('-updated_at').values('pk')[:1]
+    )).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+def remember_recipe_id(sender, instance, created, **kwargs):
+    if created:
+        pk = instance.pk
+        transaction.on_commit(lambda: recipe_ids.add(pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe(sender, instance, **kwargs):
+    recipe_cache.delete(instance.pk)
+    recipe_ids.discard(instance.pk)
+
+
+@receiver(pre_save, sender=FoodgramUser)
+def check_author_fields(sender, instance, update_fields=None, raw=False,
+                        **kwargs):
+    """Запомнить, меняются ли поля автора в представлении его рецептов.
+
+    Без update_fields (например, при смене пароля) поля сверяются с
+    сохранёнными в базе одним запросом.
+    """
+    if raw or instance._state.adding:
+        changed = False
+    elif update_fields is not None:
+        changed = not AUTHOR_FIELDS.isdisjoint(update_fields)
+    else:
+        changed = not FoodgramUser.objects.filter(pk=instance.pk, **{
+            field: getattr(instance, field) for field in AUTHOR_FIELDS
+        }).exists()
+    instance._author_fields_changed = changed
+
+
+@receiver(post_save, sender=FoodgramUser)
+def touch_author_recipes(sender, instance, **kwargs):
+    if getattr(instance, '_author_fields_changed', False):
+        touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def touch_reference_table(sender, **kwargs):
+    touch_table(sender)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_map(sender, **kwargs):
+    tag_map.invalidate()
+
+
+@receiver(post_save, sender=FoodgramUser)
+def forget_changed_user(sender, instance, created, update_fields=None,
+                        raw=False, **kwargs):
+    if not (created or raw or update_fields == frozenset({'last_login'})):
+        forget_users([instance.pk])
+
+
+@receiver(post_delete, sender=FoodgramUser)
+def forget_deleted_user(sender, instance, **kwargs):
+    forget_users([instance.pk])
+
+
+@receiver(post_delete, sender=Token)
+def forget_token_user(sender, instance, **kwargs):
+    forget_users([instance.user_id])
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def forget_subscriber(sender, instance, raw=False, **kwargs):
+    # У подписчика сменилась subscriptions_version.
+    if not raw:
+        forget_users([instance.subscriber_id])
@@ -0,0 +1,88 @@
+"""Общая основа тестов API."""
+import shutil
+import tempfile
+from collections import defaultdict
+
+from django.test import TestCase, override_settings
+
+from api.authentication import token_cache
+from api.cache import recipe_cache, recipe_ids, tag_map
+from api.follows import follow_cache
+from api.ingredient_index import ingredient_index
+from recipes.counters import COUNTERS, repair_counters
+from recipes.images import deferred_variants
+from recipes.management.commands.benchmark_api import Dataset
+from recipes.models import ShoppingListItem
+from recipes.shopping_lists import rebuild_all
+
+BATCH_SIZE = 1000
+
+
+def counter_fields():
+    fields = defaultdict(list)
+    for model, field, _, _ in COUNTERS:
+        fields[model].append(field)
+    return fields
+
+
+def shopping_list_items():
+    return set(ShoppingListItem.objects.values_list(
+        'user_id', 'ingredient_id', 'amount', 'recipes_count'
+    ))
+
+
+def clear_caches():
+    """Кэши процесса переживают откат транзакции теста."""
+    for cache in (recipe_cache, follow_cache, token_cache):
+        cache.clear()
+    token_cache.checked_at = None
+    for snapshot in (tag_map, recipe_ids, ingredient_index):
+        snapshot.invalidate()
+
+
+class DatasetMixin:
+    """Набор данных benchmark_api и картинки во временном MEDIA_ROOT."""
+
+    users = 6
+    recipes = 15
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def create_dataset(cls):
+        # Копии картинок строятся после создания набора, не в потоках.
+        with deferred_variants():
+            return Dataset(cls.users, cls.recipes, seed=1)
+
+    def assertCountersConsistent(self):
+        """Счётчики и списки покупок совпадают с пересчитанными заново."""
+        for model, fields in counter_fields().items():
+            self.assertEqual(
+                repair_counters(model, fields, BATCH_SIZE, dry_run=True), 0,
+                f'расходятся счётчики {model.__name__}'
+            )
+        items = shopping_list_items()
+        rebuild_all(BATCH_SIZE)
+        self.assertEqual(shopping_list_items(), items)
+
+
+class DatasetTestCase(DatasetMixin, TestCase):
+    """Набор данных создаётся один раз на класс тестов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = cls.create_dataset()
+
+    def setUp(self):
+        clear_caches()
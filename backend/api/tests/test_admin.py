@@ -0,0 +1,54 @@
+from recipes.models import (
+    Favorite, FoodgramUser, RecipeIngredient, ShoppingCart, Subscription
+)
+from .base import DatasetTestCase
+
+
+class CountedKeysAdminTest(DatasetTestCase):
+    """Ключи, от которых зависят счётчики, в админке не правятся."""
+
+    def setUp(self):
+        super().setUp()
+        admin = FoodgramUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin',
+            first_name='Админ', last_name='Админов'
+        )
+        self.client.force_login(admin)
+
+    def change_form(self, instance):
+        response = self.client.get(
+            f'/admin/recipes/{instance._meta.model_name}/'
+            f'{instance.pk}/change/'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.context['adminform'].form
+
+    def test_keys_are_read_only(self):
+        for instance, keys in (
+            (self.data.recipe, {'author'}),
+            (Favorite.objects.first(), {'user', 'recipe'}),
+            (ShoppingCart.objects.first(), {'user', 'recipe'}),
+            (Subscription.objects.first(), {'subscriber', 'subscribed_to'}),
+            (RecipeIngredient.objects.first(), {'recipe', 'ingredient'}),
+        ):
+            self.assertFalse(
+                keys & set(self.change_form(instance).fields), instance
+            )
+
+    def test_new_records_get_keys(self):
+        response = self.client.get('/admin/recipes/favorite/add/')
+        self.assertLessEqual(
+            {'user', 'recipe'}, set(response.context['adminform'].form.fields)
+        )
+
+    def test_inline_ingredient_is_locked_for_saved_rows(self):
+        response = self.client.get(
+            f'/admin/recipes/recipe/{self.data.recipe.pk}/change/'
+        )
+        forms = response.context['inline_admin_formsets'][0].formset.forms
+        for form in forms:
+            self.assertEqual(
+                form.fields['ingredient'].disabled,
+                form.instance.pk is not None
+            )
+        self.assertTrue(any(form.instance.pk is None for form in forms))
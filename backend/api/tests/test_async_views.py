@@ -0,0 +1,90 @@
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from recipes import short_links
+from .base import DatasetMixin, clear_caches
+
+
+class AsyncViewsTest(DatasetMixin, TransactionTestCase):
+    """Асинхронные маршруты ASGI отвечают так же, как синхронные.
+
+    Представления читают базу в других потоках, поэтому набор данных
+    фиксируется в базе, а не живёт в транзакции теста. Соединения потоков
+    с базой SQLite в памяти Django не закрывает, и они не возвращаются в
+    пул, — с ней тест не запускается.
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('соединения с базой в памяти не возвращаются в пул')
+        clear_caches()
+        self.data = self.create_dataset()
+
+    def tearDown(self):
+        clear_caches()
+
+    def sync_get(self, url, token):
+        return self.data.client(token).get(url)
+
+    @override_settings(ROOT_URLCONF='backend.asgi_urls')
+    def async_get(self, url, token):
+        headers = {'authorization': f'Token {token}'} if token else {}
+
+        async def get():
+            return await AsyncClient().get(url, **headers)
+
+        return async_to_sync(get)()
+
+    def assertSameResponses(self, urls):
+        for token in (None, self.data.token):
+            for url in urls:
+                with self.subTest(url=url, token=token):
+                    # Второй асинхронный запрос — из прогретой памяти.
+                    expected = self.sync_get(url, token)
+                    for _ in range(2):
+                        response = self.async_get(url, token)
+                        self.assertEqual(
+                            response.status_code, expected.status_code
+                        )
+                        self.assertEqual(response.content, expected.content)
+                        self.assertEqual(
+                            response.get('ETag'), expected.get('ETag')
+                        )
+
+    def test_read_endpoints(self):
+        tags = '&'.join(f'tags={tag.slug}' for tag in self.data.tags[:2])
+        self.assertSameResponses([
+            '/api/tags/',
+            '/api/ingredients/',
+            # Запрос кодируется заранее: клиенты тестов кодируют его
+            # по-разному, а адрес входит в ETag.
+            '/api/ingredients/?' + urlencode({'name': 'продукт 1'}),
+            '/api/ingredients/?' + urlencode(
+                {'name': 'укт 2', 'match': 'contains'}
+            ),
+            '/api/ingredients/?' + urlencode({'name': 'нет такого'}),
+            '/api/recipes/?limit=5',
+            f'/api/recipes/?limit=5&{tags}',
+            '/api/recipes/?is_favorited=1',
+        ])
+
+    def test_short_links(self):
+        pk = self.data.recipe.pk
+        self.assertSameResponses([
+            f'/s/{short_links.encode(pk)}/',
+            f'/s/{pk}/',
+            f'/s/{short_links.encode(pk + 10 ** 6)}/',
+        ])
+        response = self.async_get(f'/s/{short_links.encode(pk)}/', None)
+        self.assertTrue(response['Location'].endswith(f'/recipes/{pk}/'))
+
+    def test_invalid_token(self):
+        url = '/api/ingredients/?' + urlencode({'name': 'прод'})
+        expected = self.sync_get(url, 'wrong')
+        self.assertEqual(expected.status_code, 401)
+        response = self.async_get(url, 'wrong')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.content, expected.content)
@@ -0,0 +1,66 @@
+import base64
+import binascii
+import io
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from api.fields import Base64ImageField, decode_base64
+from recipes.management.commands.benchmark_api import make_image, make_png
+
+
+class DecodeBase64Test(SimpleTestCase):
+
+    @mock.patch('api.fields.CHUNK_SIZE', 8)
+    def test_chunks_match_whole_decoding(self):
+        data = make_png()
+        text = base64.encodebytes(data).decode()
+        self.assertIn('\n', text)
+        file = io.BytesIO()
+        head = decode_base64('xx' + text, 2, file)
+        self.assertEqual(file.getvalue(), data)
+        self.assertEqual(head, data[:len(head)])
+
+    @mock.patch('api.fields.CHUNK_SIZE', 8)
+    def test_incorrect_padding(self):
+        for text in ('QUJD' * 5 + 'QQ', 'QUJDR'):
+            with self.assertRaises(binascii.Error):
+                decode_base64(text, 0, io.BytesIO())
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+
+    def decode(self, data):
+        return Base64ImageField().to_internal_value(data)
+
+    def test_png_is_decoded_to_temporary_file(self):
+        upload = self.decode(make_image())
+        path = upload.temporary_file_path()
+        self.assertTrue(upload.name.endswith('.png'))
+        self.assertEqual(open(path, 'rb').read(), make_png())
+        upload.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_invalid_data(self):
+        for data in (
+            'data:image/png;base64,QUJDR',
+            'data:image/png;base64,' + base64.b64encode(b'text').decode(),
+            'data:image/png;base64,ЖЖЖЖ',
+        ):
+            with self.assertRaises(ValidationError):
+                self.decode(data)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=100)
+    def test_size_is_checked_before_decoding(self):
+        with mock.patch('api.fields.decode_to_file') as decode_to_file:
+            with self.assertRaisesMessage(ValidationError, 'Размер'):
+                self.decode(make_image())
+        decode_to_file.assert_not_called()
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=64 * 64 - 1)
+    def test_pixel_limit(self):
+        self.decode(make_image((64, 63))).close()
+        with self.assertRaisesMessage(ValidationError, '64×64'):
+            self.decode(make_image((64, 64)))
@@ -0,0 +1,103 @@
+import json
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from recipes.images import deferred_variants
+from recipes.management.commands.benchmark_api import (
+    BASELINE_FILE, NOT_EMPTY, get_scenarios, result_count, run_scenario
+)
+from recipes.models import Favorite, ShoppingCart
+from .base import DatasetMixin, clear_caches
+
+
+def recipe_items(data):
+    """Рецепты в ответе: страница, список или один рецепт."""
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        data = data['results']
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        return []
+    return [
+        item for item in data
+        if isinstance(item, dict) and 'is_favorited' in item
+    ]
+
+
+class BenchmarkScenariosTest(DatasetMixin, TransactionTestCase):
+    """Сценарии benchmark_api: число запросов не выше эталона и ответы верны.
+
+    Транзакция теста не оборачивает сценарии: atomic внутри них, как и в
+    замере, открывает транзакцию, а не точку сохранения, и число запросов
+    сравнимо с эталоном. Эталон берётся для СУБД, на которой идут тесты
+    (manage.py benchmark_api --update-baseline).
+    """
+
+    users = 30
+    recipes = 60
+
+    def setUp(self):
+        clear_caches()
+        self.data = self.create_dataset()
+        with open(BASELINE_FILE, encoding='utf-8') as file:
+            baseline = json.load(file)
+        self.assertIn(
+            connection.vendor, baseline, 'нет эталона для этой СУБД'
+        )
+        self.baseline = baseline[connection.vendor]
+
+    def tearDown(self):
+        clear_caches()
+
+    def test_scenarios(self):
+        users = {
+            None: None,
+            self.data.token: self.data.user,
+            self.data.author_token: self.data.author,
+        }
+        with deferred_variants():
+            for name, *scenario in get_scenarios(self.data):
+                with self.subTest(name):
+                    # Второй прогон — с прогретыми кэшами, как в замере.
+                    for _ in range(2):
+                        path, response, queries, _, _ = run_scenario(
+                            self.data, *scenario
+                        )
+                    self.assertLess(response.status_code, 400, path)
+                    self.assertIn(name, self.baseline, 'нет в эталоне')
+                    self.assertLessEqual(
+                        queries, self.baseline[name]['queries'], path
+                    )
+                    if name in NOT_EMPTY:
+                        self.assertTrue(result_count(response), path)
+                    self.check_flags(users[scenario[0]], response)
+                    if name.startswith('recipes-search'):
+                        self.check_search(name, response)
+
+    def check_flags(self, user, response):
+        items = recipe_items(getattr(response, 'data', None))
+        favorites = set(Favorite.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True)) if user else set()
+        cart = set(ShoppingCart.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True)) if user else set()
+        for item in items:
+            self.assertEqual(
+                item['is_favorited'], item['id'] in favorites, item['id']
+            )
+            self.assertEqual(
+                item['is_in_shopping_cart'], item['id'] in cart, item['id']
+            )
+
+    def check_search(self, name, response):
+        words = {
+            'recipes-search': 'пирог с капустой',
+            'recipes-search-filtered': 'суп',
+        }[name]
+        tags = {tag.slug for tag in self.data.tags[:2]}
+        for item in response.data['results']:
+            self.assertIn(words, item['name'].lower())
+            if name == 'recipes-search-filtered':
+                self.assertTrue(tags & {tag['slug'] for tag in item['tags']})
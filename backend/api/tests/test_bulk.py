@@ -0,0 +1,38 @@
+from recipes.models import Recipe
+from .base import DatasetTestCase
+
+
+class RecipeBulkCreateTest(DatasetTestCase):
+
+    def payload(self, index):
+        data = self.data.recipe_payload()
+        data['name'] = f'Рецепт пачки {index}'
+        data['tags'] = [self.data.tags[index].id]
+        data['ingredients'] = [
+            {'id': self.data.ingredients[index].id, 'amount': index + 1}
+        ]
+        return data
+
+    def test_created_recipes_keep_their_rows(self):
+        items = [self.payload(index) for index in range(4)]
+        items[1]['cooking_time'] = 0
+        response = self.data.client(self.data.author_token).post(
+            '/api/recipes/bulk/', items, format='json'
+        )
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertIn('errors', response.data[1])
+        for index in (0, 2, 3):
+            recipe = Recipe.objects.get(pk=response.data[index]['id'])
+            self.assertEqual(recipe.name, f'Рецепт пачки {index}')
+            self.assertEqual(recipe.author, self.data.author)
+            self.assertEqual(
+                list(recipe.tags.values_list('pk', flat=True)),
+                [self.data.tags[index].id]
+            )
+            self.assertEqual(
+                list(recipe.recipe_ingredients.values_list(
+                    'ingredient_id', 'amount'
+                )),
+                [(self.data.ingredients[index].id, index + 1)]
+            )
+        self.assertCountersConsistent()
@@ -0,0 +1,35 @@
+from recipes.models import Subscription
+from .base import DatasetTestCase
+
+
+class RecipeConditionalTest(DatasetTestCase):
+
+    def test_non_numeric_pk_is_not_found(self):
+        for client in (
+            self.data.client(), self.data.client(self.data.token)
+        ):
+            self.assertEqual(client.get('/api/recipes/abc/').status_code, 404)
+
+    def test_unchanged_recipe_is_not_modified(self):
+        client = self.data.client(self.data.token)
+        url = f'/api/recipes/{self.data.recipe.pk}/'
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_subscription_changes_etag(self):
+        Subscription.objects.get_or_create(
+            subscriber=self.data.user, subscribed_to=self.data.recipe.author
+        )
+        client = self.data.client(self.data.token)
+        url = f'/api/recipes/{self.data.recipe.pk}/'
+        etag = client.get(url)['ETag']
+        Subscription.objects.filter(
+            subscriber=self.data.user,
+            subscribed_to=self.data.recipe.author
+        ).delete()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['author']['is_subscribed'])
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,70 @@
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from recipes.models import Favorite, FoodgramUser, Recipe, Subscription
+from .base import DatasetMixin
+
+
+class GenerateDatasetTest(DatasetMixin, TestCase):
+    """generate_dataset: связи верны, счётчики сходятся, зерно повторяет."""
+
+    def generate(self, prefix, **options):
+        call_command(
+            'generate_dataset', users=5, recipes=20, images=1,
+            batch_size=7, prefix=prefix, stdout=io.StringIO(), **options
+        )
+
+    @staticmethod
+    def relations(prefix):
+        """Связи набора без ключей и префикса: их можно сравнивать."""
+        def user(username):
+            return username[len(prefix):]
+
+        return (
+            sorted(
+                (user(author), name) for author, name in
+                Recipe.objects.filter(
+                    author__username__startswith=prefix
+                ).values_list('author__username', 'name')
+            ),
+            sorted(
+                (user(username), name) for username, name in
+                Favorite.objects.filter(
+                    user__username__startswith=prefix
+                ).values_list('user__username', 'recipe__name')
+            ),
+            sorted(
+                (user(subscriber), user(author)) for subscriber, author in
+                Subscription.objects.filter(
+                    subscriber__username__startswith=prefix
+                ).values_list(
+                    'subscriber__username', 'subscribed_to__username'
+                )
+            ),
+        )
+
+    def test_same_seed_gives_same_relations(self):
+        # Чужой пользователь с тем же началом имени и его рецепт не
+        # должны попасть в ключи нового набора.
+        self.generate('first')
+        other = FoodgramUser.objects.create(
+            username='second_other', email='other@example.com'
+        )
+        Recipe.objects.create(
+            author=other, name='Чужой рецепт 3', text='Текст',
+            cooking_time=1, image='media/images/placeholder_0.png'
+        )
+        self.generate('second')
+        other.delete()
+        first = self.relations('first')
+        self.assertEqual(len(first[0]), 20)
+        self.assertEqual(first, self.relations('second'))
+        self.assertCountersConsistent()
+
+    def test_taken_prefix_is_refused(self):
+        self.generate('taken')
+        with self.assertRaises(CommandError):
+            self.generate('taken')
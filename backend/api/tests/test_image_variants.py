@@ -0,0 +1,78 @@
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase
+from PIL import Image
+
+from recipes.images import (
+    VARIANT_FORMATS, VARIANT_SIZES, build_variants, needs_variants,
+    render_variants
+)
+from recipes.management.commands.benchmark_api import make_png
+from recipes.models import Recipe
+from .base import DatasetTestCase
+
+
+class RenderVariantsTest(SimpleTestCase):
+
+    def test_sizes_and_formats(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (300, 100), (0, 0, 255, 0)).save(buffer, 'PNG')
+        rendered = render_variants(buffer.getvalue())
+        self.assertEqual(set(rendered), set(VARIANT_SIZES))
+        for variant, files in rendered.items():
+            self.assertEqual(set(files), set(VARIANT_FORMATS))
+            for image_format, content in files.items():
+                image = Image.open(io.BytesIO(content))
+                self.assertEqual(image.format, image_format.upper())
+                self.assertEqual(image.size, VARIANT_SIZES[variant])
+
+    def test_broken_image(self):
+        with self.assertRaises(OSError):
+            render_variants(b'not an image')
+
+
+class BuildVariantsTest(DatasetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = Recipe.objects.filter(author=self.data.author).first()
+
+    def variant_files(self, variants):
+        return [
+            name for variant, files in variants.items()
+            if variant != 'source' for name in files.values()
+        ]
+
+    def test_variants_follow_image(self):
+        build_variants(Recipe, self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.assertFalse(needs_variants(self.recipe))
+        old_files = self.variant_files(self.recipe.image_variants)
+        self.assertTrue(old_files)
+        self.assertTrue(all(map(default_storage.exists, old_files)))
+
+        response = self.data.client().get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(
+            set(response.data['image_variants']), set(VARIANT_SIZES)
+        )
+
+        self.recipe.image.save(
+            'new.png', ContentFile(make_png((200, 100))), save=True
+        )
+        self.assertTrue(needs_variants(self.recipe))
+        build_variants(Recipe, self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.image_variants['source'], self.recipe.image.name
+        )
+        self.assertFalse(any(map(default_storage.exists, old_files)))
+
+    def test_processed_image_is_skipped(self):
+        build_variants(Recipe, self.recipe.pk)
+        self.recipe.refresh_from_db()
+        variants = self.recipe.image_variants
+        build_variants(Recipe, self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, variants)
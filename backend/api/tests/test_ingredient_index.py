@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+from .base import DatasetTestCase
+
+
+class IngredientIndexTest(DatasetTestCase):
+
+    def search(self, name, **params):
+        response = self.data.client().get(
+            '/api/ingredients/', {'name': name, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data]
+
+    def expire_index(self):
+        """Как будто прошёл срок сверки снимка с таблицей."""
+        ingredient_index.checked_at = (
+            time.monotonic() - settings.INGREDIENT_INDEX_REFRESH - 1
+        )
+
+    def test_prefix_matches_database(self):
+        self.assertEqual(
+            self.search('ПРОДУКТ 1'),
+            sorted(
+                Ingredient.objects.filter(
+                    name__istartswith='продукт 1'
+                ).values_list('name', flat=True),
+                key=str.casefold
+            )
+        )
+
+    def test_contains_lists_prefix_matches_first(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        Ingredient.objects.create(name='Морская соль', measurement_unit='г')
+        self.assertEqual(
+            self.search('соль', match='contains'), ['Соль', 'Морская соль']
+        )
+        self.assertEqual(self.search('соль'), ['Соль'])
+
+    def test_created_ingredient_is_found(self):
+        self.assertEqual(self.search('ваниль'), [])
+        Ingredient.objects.create(name='Ваниль', measurement_unit='г')
+        self.assertEqual(self.search('ваниль'), ['Ваниль'])
+
+    def test_bulk_insert_is_found_after_refresh(self):
+        ingredient_index.refresh()
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Кардамон', measurement_unit='г'),
+        ])
+        self.assertEqual(ingredient_index.search('кардамон'), [])
+        # Поиск в API при промахе индекса идёт в базу; LIKE в SQLite
+        # не сравнивает кириллицу без учёта регистра.
+        self.assertEqual(self.search('Кардамон'), ['Кардамон'])
+        self.expire_index()
+        ingredient_index.refresh()
+        self.assertEqual(
+            [row['name'] for row in ingredient_index.search('кардамон')],
+            ['Кардамон']
+        )
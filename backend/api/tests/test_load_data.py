@@ -0,0 +1,104 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from recipes.management.commands.load_data import read_json
+from recipes.models import Ingredient, Tag
+
+
+class LoadDataTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def load(self, *paths, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(
+            'load_data', *paths, stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def rows(self):
+        return (
+            sorted(Ingredient.objects.values_list(
+                'name', 'measurement_unit'
+            )),
+            sorted(Tag.objects.values_list('slug', 'name')),
+        )
+
+    def test_second_run_changes_nothing(self):
+        ingredients = self.write(
+            'ingredients.csv',
+            'name,measurement_unit\nсоль,г\nмолоко,мл\nсоль,г\n'
+        )
+        tags = self.write('tags.json', json.dumps([
+            {'name': 'Завтрак', 'slug': 'breakfast'},
+            {'name': 'Обед', 'slug': 'lunch'},
+        ]))
+        self.load(ingredients, tags, batch_size=1)
+        rows = self.rows()
+        self.assertEqual(rows, (
+            [('молоко', 'мл'), ('соль', 'г')],
+            [('breakfast', 'Завтрак'), ('lunch', 'Обед')],
+        ))
+        stdout, _ = self.load(ingredients, tags)
+        self.assertEqual(self.rows(), rows)
+        self.assertIn('добавлено 0, обновлено 0', stdout)
+
+    def test_changed_name_is_updated_in_place(self):
+        self.load(self.write('tags.json', json.dumps([
+            {'name': 'Обед', 'slug': 'lunch'},
+        ])))
+        pk = Tag.objects.get().pk
+        stdout, _ = self.load(self.write('tags.json', json.dumps([
+            {'name': 'Ланч', 'slug': 'lunch'},
+        ])))
+        self.assertEqual(
+            list(Tag.objects.values_list('pk', 'name')), [(pk, 'Ланч')]
+        )
+        self.assertIn('добавлено 0, обновлено 1', stdout)
+
+    def test_invalid_rows_are_reported(self):
+        _, stderr = self.load(self.write(
+            'products.csv', 'соль,г\n,кг\nперец\n'
+        ), model='ingredients')
+        self.assertEqual(
+            list(Ingredient.objects.values_list('name', flat=True)), ['соль']
+        )
+        self.assertIn('строка 2', stderr)
+        self.assertIn('строка 3', stderr)
+
+
+class ReadJsonTest(SimpleTestCase):
+
+    def test_items_across_buffers(self):
+        items = [
+            {'name': 'продукт ' * size, 'measurement_unit': 'г'}
+            for size in (1, 40, 3, 200, 1)
+        ]
+        text = '[ ' + ' ,\n'.join(json.dumps(item) for item in items) + ' ]'
+        for buffer_size in (1, 7, 64, len(text)):
+            self.assertEqual(
+                list(read_json(io.StringIO(text), buffer_size)), items
+            )
+
+    def test_empty_array(self):
+        self.assertEqual(list(read_json(io.StringIO('[ ]'), 1)), [])
+
+    def test_broken_json(self):
+        for text in ('{"name": "соль"}', '[{"name": "соль"}', '[{"na'):
+            with self.assertRaises(CommandError):
+                list(read_json(io.StringIO(text), 4))
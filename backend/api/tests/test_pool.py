@@ -0,0 +1,107 @@
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from backend.db.pool import ConnectionPool, get_pool
+
+
+class FakeConnection:
+
+    def __init__(self, usable=True):
+        self.usable = usable
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        if not self.usable:
+            raise OSError('соединение разорвано')
+        return self
+
+    def execute(self, sql):
+        pass
+
+
+class PoolError(Exception):
+    pass
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def pool(self, max_size=2, max_lifetime=60, check_idle=60, timeout=0.01):
+        return ConnectionPool(max_size, max_lifetime, check_idle, timeout)
+
+    def test_returned_connection_is_reused(self):
+        pool = self.pool()
+        first = pool.acquire(FakeConnection, PoolError)
+        pool.release(first)
+        self.assertEqual(first.rollbacks, 1)
+        self.assertIs(pool.acquire(FakeConnection, PoolError), first)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['reused']), (1, 1))
+        self.assertEqual((stats['size'], stats['in_use']), (1, 1))
+
+    def test_checkout_waits_and_fails_when_pool_is_full(self):
+        pool = self.pool(max_size=1)
+        pool.acquire(FakeConnection, PoolError)
+        with self.assertRaises(PoolError):
+            pool.acquire(FakeConnection, PoolError)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_discarded_connection_frees_its_place(self):
+        pool = self.pool(max_size=1)
+        first = pool.acquire(FakeConnection, PoolError)
+        pool.discard(first, 'broken')
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.acquire(FakeConnection, PoolError), first)
+        self.assertEqual(pool.stats()['broken'], 1)
+
+    def test_old_connection_is_recycled(self):
+        pool = self.pool(max_lifetime=0)
+        first = pool.acquire(FakeConnection, PoolError)
+        pool.release(first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['recycled'], 1)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connection_is_checked(self):
+        pool = self.pool(check_idle=0)
+        first = pool.acquire(FakeConnection, PoolError)
+        pool.release(first)
+        first.usable = False
+        second = pool.acquire(FakeConnection, PoolError)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['broken'], 1)
+
+    def test_failed_connect_frees_its_place(self):
+        pool = self.pool(max_size=1)
+
+        def connect():
+            raise PoolError('нет связи')
+
+        with self.assertRaises(PoolError):
+            pool.acquire(connect, PoolError)
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.acquire(FakeConnection, PoolError)
+
+
+class PooledBackendTest(TransactionTestCase):
+
+    def test_closed_connection_returns_to_pool(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Django не закрывает соединение с базой в памяти')
+        connection.ensure_connection()
+        driver_connection = connection.connection
+        pool = get_pool(connection.pool_key)
+        idle = pool.stats()['idle']
+        connection.close()
+        self.assertEqual(pool.stats()['idle'], idle + 1)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(connection.connection, driver_connection)
+        self.assertEqual(pool.stats()['idle'], idle)
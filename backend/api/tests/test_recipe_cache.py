@@ -0,0 +1,46 @@
+from django.utils import timezone
+
+from recipes.models import Recipe
+from .base import DatasetTestCase
+
+
+class AuthorChangeTest(DatasetTestCase):
+    """Рецепты автора устаревают только при правке полей автора в них."""
+
+    def versions(self):
+        return dict(Recipe.objects.filter(
+            author=self.data.author
+        ).values_list('pk', 'updated_at'))
+
+    def assertTouched(self, touched, change):
+        versions = self.versions()
+        change(self.data.author)
+        self.assertEqual(self.versions() != versions, touched)
+
+    def test_login_does_not_touch_recipes(self):
+        def login(author):
+            author.last_login = timezone.now()
+            author.save(update_fields=['last_login'])
+        self.assertTouched(False, login)
+
+    def test_unchanged_save_does_not_touch_recipes(self):
+        def set_password(author):
+            author.set_password('new-password')
+            author.save()
+        self.assertTouched(False, set_password)
+
+    def test_name_change_touches_recipes(self):
+        def rename(author):
+            author.first_name = 'Другое'
+            author.save()
+        self.assertTouched(True, rename)
+        response = self.data.client().get(
+            f'/api/recipes/{self.versions().popitem()[0]}/'
+        )
+        self.assertEqual(response.data['author']['first_name'], 'Другое')
+
+    def test_avatar_update_touches_recipes(self):
+        def set_variants(author):
+            author.avatar_variants = {'source': 'avatar.png'}
+            author.save(update_fields=['avatar_variants'])
+        self.assertTouched(True, set_variants)
@@ -0,0 +1,39 @@
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from .base import DatasetTestCase
+
+
+class RecipeUpdateTest(DatasetTestCase):
+
+    def test_ingredients_diff_keeps_counters(self):
+        recipe = Recipe.objects.filter(author=self.data.author).first()
+        ShoppingCart.objects.get_or_create(user=self.data.user, recipe=recipe)
+        old = list(
+            RecipeIngredient.objects.filter(recipe=recipe)
+            .order_by('ingredient_id')
+            .values_list('ingredient_id', flat=True)
+        )
+        added = list(
+            Ingredient.objects.exclude(pk__in=old)
+            .values_list('pk', flat=True)[:3]
+        )
+        removed = old[4:]
+        payload = self.data.recipe_payload()
+        payload['ingredients'] = [
+            {'id': pk, 'amount': 7} for pk in old[:4] + added
+        ]
+
+        response = self.data.client(self.data.author_token).patch(
+            f'/api/recipes/{recipe.pk}/', payload, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            set(RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).values_list('ingredient_id', 'amount')),
+            {(pk, 7) for pk in old[:4] + added}
+        )
+        self.assertFalse(RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient_id__in=removed
+        ).exists())
+        self.assertCountersConsistent()
@@ -0,0 +1,47 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from recipes import search
+from .base import DatasetTestCase
+
+
+class RecipeSearchTest(DatasetTestCase):
+    """Поиск после всех миграций: индекс следит за вставкой и правкой."""
+
+    def search(self, query):
+        response = self.data.client().get(
+            '/api/recipes/', {'search': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_created_and_edited_recipe_is_found(self):
+        author = self.data.client(self.data.author_token)
+        payload = self.data.recipe_payload()
+        payload['name'] = 'Расстегай с рыбой'
+        response = author.post('/api/recipes/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        pk = response.data['id']
+        self.assertEqual(self.search('расстегай'), [pk])
+
+        response = author.patch(
+            f'/api/recipes/{pk}/',
+            {**payload, 'name': 'Кулебяка', 'text': 'Тесто и капуста'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.search('расстегай'), [])
+        self.assertEqual(self.search('кулебяка'), [pk])
+        self.assertIn(pk, self.search('капуста'))
+
+    def test_dataset_recipes_are_found(self):
+        self.assertTrue(self.search('пирог капуста'))
+
+    @skipUnless(connection.vendor == 'sqlite', 'триггеры FTS5 есть в SQLite')
+    def test_dropped_trigger_is_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.TRIGGERS[0]}')
+        self.assertTrue(search.restore_triggers())
+        self.assertFalse(search.restore_triggers())
+        self.test_created_and_edited_recipe_is_found()
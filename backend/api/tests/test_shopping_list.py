@@ -0,0 +1,30 @@
+import io
+
+from pypdf import PdfReader
+
+from recipes.models import ShoppingListItem
+from .base import DatasetTestCase
+
+
+class ShoppingListDownloadTest(DatasetTestCase):
+
+    def download(self, file_format):
+        response = self.data.client(self.data.token).get(
+            '/api/recipes/download_shopping_cart/',
+            {'file_format': file_format}
+        )
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_pdf_contains_text_rows(self):
+        self.assertTrue(
+            ShoppingListItem.objects.filter(user=self.data.user).exists()
+        )
+        lines = self.download('txt').decode().splitlines()
+        reader = PdfReader(io.BytesIO(self.download('pdf')))
+        text = '\n'.join(page.extract_text() for page in reader.pages)
+        pdf_lines = {line.strip() for line in text.splitlines()}
+        # Первая строка — время выгрузки, оно могло смениться.
+        for line in lines[1:]:
+            if line:
+                self.assertIn(line, pdf_lines)
@@ -0,0 +1,44 @@
+from recipes import short_links
+from recipes.constants import MAX_PK_VALUE
+from .base import DatasetTestCase
+
+
+class ShortLinkTest(DatasetTestCase):
+
+    def test_code_round_trip(self):
+        for pk in (1, 51, 52, 62 * 52, 10 ** 6, MAX_PK_VALUE):
+            code = short_links.encode(pk)
+            self.assertFalse(code.isdigit())
+            self.assertEqual(short_links.decode(code), pk)
+            self.assertEqual(short_links.decode(str(pk)), pk)
+
+    def test_invalid_codes(self):
+        for code in ('', '0', 'a0', '1a', 'ab-', 'é', str(MAX_PK_VALUE + 1)):
+            self.assertIsNone(short_links.decode(code), code)
+
+    def test_get_link_redirects_to_recipe(self):
+        pk = self.data.recipe.pk
+        client = self.data.client()
+        response = client.get(f'/api/recipes/{pk}/get-link/')
+        self.assertEqual(response.status_code, 200)
+        link = response.data['short-link']
+        self.assertIn(f'/s/{short_links.encode(pk)}/', link)
+        for url in (link, f'/s/{pk}/'):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(
+                response['Location'].endswith(f'/recipes/{pk}/')
+            )
+
+    def test_unknown_recipe_is_not_found(self):
+        client = self.data.client()
+        missing = self.data.recipe.pk + 10 ** 6
+        for url in (
+            f'/s/{short_links.encode(missing)}/',
+            f'/s/{missing}/',
+            '/s/a0/',
+            f'/api/recipes/{missing}/get-link/',
+            '/api/recipes/abc/get-link/',
+            f'/api/recipes/{MAX_PK_VALUE + 1}/get-link/',
+        ):
+            self.assertEqual(client.get(url).status_code, 404, url)
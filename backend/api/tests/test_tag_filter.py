@@ -0,0 +1,47 @@
+from api.cache import tag_map
+from recipes.models import Recipe, Tag
+from .base import DatasetTestCase
+
+
+class TagFilterTest(DatasetTestCase):
+
+    def filter(self, *slugs):
+        response = self.data.client().get(
+            '/api/recipes/', {'tags': slugs, 'limit': 100}
+        )
+        self.assertEqual(response.status_code, 200)
+        return sorted(recipe['id'] for recipe in response.data['results'])
+
+    def expected(self, *slugs):
+        return sorted(set(Recipe.objects.filter(
+            tags__slug__in=slugs
+        ).values_list('pk', flat=True)))
+
+    def test_any_of_tags_without_duplicates(self):
+        slugs = [tag.slug for tag in self.data.tags[:3]]
+        self.assertEqual(self.filter(*slugs), self.expected(*slugs))
+        self.assertEqual(self.filter(slugs[0]), self.expected(slugs[0]))
+
+    def test_unknown_tag_finds_nothing(self):
+        self.assertEqual(self.filter('no-such-tag'), [])
+        self.assertEqual(
+            self.filter('no-such-tag', self.data.tags[0].slug),
+            self.expected(self.data.tags[0].slug)
+        )
+
+    def test_renamed_tag_is_mapped(self):
+        tag = self.data.tags[0]
+        old_slug = tag.slug
+        expected = self.expected(old_slug)
+        self.assertTrue(expected)
+        tag_map.refresh()
+        tag.slug = 'renamed'
+        tag.save()
+        self.assertEqual(self.filter('renamed'), expected)
+        self.assertEqual(self.filter(old_slug), [])
+
+    def test_new_tag_is_mapped(self):
+        tag_map.refresh()
+        tag = Tag.objects.create(name='Новый', slug='new')
+        self.data.recipe.tags.add(tag)
+        self.assertEqual(self.filter('new'), [self.data.recipe.pk])
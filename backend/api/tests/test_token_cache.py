@@ -0,0 +1,61 @@
+from api.authentication import token_cache
+from recipes.models import FoodgramUser, UserChange
+from .base import DatasetTestCase
+
+
+class TokenCacheTest(DatasetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.data.client(self.data.token)
+
+    def me(self):
+        return self.client.get('/api/users/me/')
+
+    def assertCached(self, cached):
+        self.assertEqual(
+            token_cache.get(self.data.token) is not None, cached
+        )
+
+    def test_known_token_skips_database(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.assertCached(True)
+        token_cache.refresh(force=True)
+        self.assertCached(True)
+
+    def test_logout_evicts_user(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.assertCached(True)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertCached(False)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_change_from_other_process_evicts_user(self):
+        self.assertEqual(self.me().status_code, 200)
+        # Другой процесс отключил пользователя и записал это в журнал.
+        FoodgramUser.objects.filter(pk=self.data.user.pk).update(
+            is_active=False
+        )
+        UserChange.objects.create(user_id=self.data.user.pk)
+        self.assertCached(True)
+        token_cache.refresh(force=True)
+        self.assertCached(False)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_seen_change_does_not_evict_again(self):
+        self.assertEqual(self.me().status_code, 200)
+        UserChange.objects.create(user_id=self.data.user.pk)
+        token_cache.refresh(force=True)
+        self.assertEqual(self.me().status_code, 200)
+        self.assertCached(True)
+        token_cache.refresh(force=True)
+        self.assertCached(True)
+
+    def test_user_update_evicts_user(self):
+        self.assertEqual(self.me().status_code, 200)
+        user = FoodgramUser.objects.get(pk=self.data.user.pk)
+        user.first_name = 'Другое'
+        user.save()
+        self.assertCached(False)
+        self.assertEqual(self.me().data['first_name'], 'Другое')
@@ -0,0 +1,108 @@
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.user_recipes import ABSENT, ADDED, DELETED, EXISTS, NOT_FOUND
+from .base import DatasetTestCase
+
+COLLECTIONS = (
+    ('/api/recipes/favorite/', Favorite),
+    ('/api/recipes/shopping_cart/', ShoppingCart),
+)
+
+
+class UserRecipesBulkTest(DatasetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.data.client(self.data.token)
+        self.missing = Recipe.objects.order_by('-pk').first().pk + 1
+
+    def change(self, method, url, recipe_ids):
+        response = getattr(self.client, method)(
+            url, {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(row['id'], row['status']) for row in response.data]
+
+    def split(self, model):
+        """Два рецепта из коллекции пользователя и два вне её."""
+        inside = list(
+            model.objects.filter(user=self.data.user)
+            .order_by('recipe_id').values_list('recipe_id', flat=True)[:2]
+        )
+        outside = list(
+            Recipe.objects.exclude(pk__in=model.objects.filter(
+                user=self.data.user
+            ).values('recipe_id')).order_by('pk').values_list(
+                'pk', flat=True
+            )[:2]
+        )
+        return inside, outside
+
+    def test_add_outcomes(self):
+        for url, model in COLLECTIONS:
+            with self.subTest(model=model.__name__):
+                inside, outside = self.split(model)
+                outcomes = self.change(
+                    'post', url, [outside[0], inside[0], self.missing,
+                                  outside[1], outside[0]]
+                )
+                self.assertEqual(outcomes, [
+                    (outside[0], ADDED), (inside[0], EXISTS),
+                    (self.missing, NOT_FOUND), (outside[1], ADDED),
+                ])
+                self.assertEqual(model.objects.filter(
+                    user=self.data.user, recipe_id__in=outside
+                ).count(), 2)
+                self.assertCountersConsistent()
+
+    def test_remove_outcomes(self):
+        for url, model in COLLECTIONS:
+            with self.subTest(model=model.__name__):
+                inside, outside = self.split(model)
+                outcomes = self.change(
+                    'delete', url,
+                    [inside[0], outside[0], self.missing, inside[1]]
+                )
+                self.assertEqual(outcomes, [
+                    (inside[0], DELETED), (outside[0], ABSENT),
+                    (self.missing, ABSENT), (inside[1], DELETED),
+                ])
+                self.assertFalse(model.objects.filter(
+                    user=self.data.user, recipe_id__in=inside
+                ).exists())
+                self.assertCountersConsistent()
+
+    def test_add_then_remove_restores_counters(self):
+        recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        for url, model in COLLECTIONS:
+            with self.subTest(model=model.__name__):
+                before = list(Recipe.objects.order_by('pk').values_list(
+                    'favorites_count', 'shopping_carts_count'
+                ))
+                added = [
+                    pk for pk, outcome in self.change('post', url, recipe_ids)
+                    if outcome == ADDED
+                ]
+                self.assertTrue(added)
+                self.assertCountersConsistent()
+                self.change('delete', url, added)
+                self.assertCountersConsistent()
+                self.assertEqual(
+                    list(Recipe.objects.order_by('pk').values_list(
+                        'favorites_count', 'shopping_carts_count'
+                    )),
+                    before
+                )
+
+    def test_invalid_ids_are_rejected(self):
+        for url, model in COLLECTIONS:
+            for method in ('post', 'delete'):
+                for recipe_id in (2 ** 70, 2 ** 63, 0, -1):
+                    with self.subTest(
+                        model=model.__name__, method=method, id=recipe_id
+                    ):
+                        response = getattr(self.client, method)(
+                            url, {'recipes': [recipe_id]}, format='json'
+                        )
+                        self.assertEqual(response.status_code, 400)
@@ -10,3 +10,17 @@ def check_items(data):
         raise ValidationError(
             f'{items} не уникальны.'
         )
+
+
+def validate_recipes_limit(value):
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise ValidationError(
+            {'recipes_limit': 'Укажите целое неотрицательное число.'}
+        )
+    return limit
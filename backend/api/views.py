@@ -1,13 +1,13 @@
 from datetime import datetime
 
-from django.db import IntegrityError
-from django.db.models import Sum
-from django.http import FileResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (
@@ -16,27 +16,41 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 
+from recipes import short_links, user_recipes
+from recipes.constants import MAX_PK_VALUE
 from recipes.models import (
     Favorite, Ingredient,
-    Recipe, RecipeIngredient, ShoppingCart,
+    Recipe, ShoppingCart,
     Subscription, Tag, FoodgramUser
 )
+from .bulk import create_recipes
+from .cache import prefetch_uncached_recipes, recipe_ids
+from .conditional import (
+    TableConditionalMixin, conditional_response, index_validators,
+    recipe_validators, vary_by_user
+)
 from .filters import IngredientFilter, RecipeFilter
+from .follows import forget_followed_ids
+from .ingredient_index import ingredient_index
 from .paginators import PageLimitPaginator
+from .parsers import BulkJSONParser
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     AvatarSerializer, DisplayRecipesSerializer, DisplaySubscriptionSerializer,
     FoodgramUserSerializer, IngredientSerializer, RecipeGetSerializer,
-    RecipeSerializer,
-    TagSerializer,
+    RecipeIdsSerializer, RecipeSerializer,
+    TagSerializer, recipes_by_authors,
+)
+from .shopping_list import (
+    FORMATS as SHOPPING_LIST_FORMATS, shopping_list_rows
 )
-from .utils import generate_shopping_list
 
 
 class FoodgramUserViewSet(UserViewSet):
     queryset = FoodgramUser.objects.all()
     serializer_class = FoodgramUserSerializer
     pagination_class = PageLimitPaginator
+    cursor_ordering = ('username', 'id')
     http_method_names = ('get', 'post', 'put', 'delete')
 
     def get_permissions(self):
@@ -61,6 +75,7 @@ class FoodgramUserViewSet(UserViewSet):
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated]
     )
+    @transaction.atomic
     def subscribe(self, request, id):
         if request.method == 'POST':
             author = get_object_or_404(FoodgramUser, pk=id)
@@ -72,13 +87,17 @@ class FoodgramUserViewSet(UserViewSet):
                 subscriber=user
             )
             if created:
+                forget_followed_ids(request)
                 return Response(
                     DisplaySubscriptionSerializer(
                         author, context={'request': request}
                     ).data, status=status.HTTP_201_CREATED
                 )
             raise ValidationError('Подписка уже существует.')
-        get_object_or_404(Subscription, subscribed_to=id).delete()
+        get_object_or_404(
+            Subscription, subscribed_to=id, subscriber=request.user
+        ).delete()
+        forget_followed_ids(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -87,17 +106,24 @@ class FoodgramUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-        subscriptions = FoodgramUser.objects.filter(
-            authors__subscriber=request.user
+        subscriptions = self.paginate_queryset(
+            FoodgramUser.objects.filter(authors__subscriber=request.user)
         )
-        paginated_subscriptions = self.paginate_queryset(subscriptions)
         serializer = DisplaySubscriptionSerializer(
-            paginated_subscriptions, context={'request': request}, many=True
+            subscriptions,
+            context={
+                'request': request,
+                'recipes_by_author': recipes_by_authors(
+                    [author.pk for author in subscriptions], request
+                ),
+                'subscribed_ids': {author.pk for author in subscriptions},
+            },
+            many=True
         )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(TableConditionalMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = IngredientSerializer
@@ -105,15 +131,73 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Поиск по названию отвечает из индекса в памяти без запросов к БД.
+
+        Если в индексе ничего не нашлось (например, продукт только что
+        добавлен в другом процессе), поиск повторяется в базе данных.
+        """
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        contains = (
+            request.query_params.get('match') == IngredientFilter.CONTAINS
+        )
+
+        def build_response():
+            found = ingredient_index.search(name, contains=contains)
+            if found:
+                return Response(found)
+            return mixins.ListModelMixin.list(
+                self, request, *args, **kwargs
+            )
+
+        return conditional_response(
+            request,
+            *index_validators(request, ingredient_index.refresh()),
+            build_response
+        )
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    search_fields = ('tags',)
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.select_related('author').with_user_flags(
+                self.request.user
+            )
+        return Recipe.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        prefetch_uncached_recipes(page, request)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        etag, last_modified = recipe_validators(request, pk)
+        if etag is None:
+            raise Http404
+        return vary_by_user(conditional_response(
+            request, etag, last_modified, self.get_recipe_response
+        ))
+
+    def get_recipe_response(self):
+        recipe = self.get_object()
+        prefetch_uncached_recipes([recipe], self.request)
+        return Response(self.get_serializer(recipe).data)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -121,19 +205,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeSerializer
 
     @staticmethod
+    @transaction.atomic
     def add_or_delete_recipe_from_collection(request, pk, model):
+        recipe = get_object_or_404(Recipe, id=pk)
         if request.method == 'POST':
-            user = request.user
-            recipe = get_object_or_404(Recipe, id=pk)
             try:
-                model.objects.create(user=user, recipe=recipe)
+                model.objects.create(user=request.user, recipe=recipe)
             except IntegrityError:
                 raise ValidationError('Рецепт уже добавлен.')
             return Response(
                 DisplayRecipesSerializer(recipe).data,
                 status=status.HTTP_201_CREATED
             )
-        get_object_or_404(model, recipe=recipe).delete()
+        get_object_or_404(model, user=request.user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -160,27 +244,97 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ShoppingCart
         )
 
+    @staticmethod
+    def change_collection(request, model):
+        """Добавить или убрать пачку рецептов; ответ — итог по каждому id."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        change = (
+            user_recipes.add_recipes if request.method == 'POST'
+            else user_recipes.remove_recipes
+        )
+        return Response([
+            {'id': pk, 'status': outcome}
+            for pk, outcome in change(
+                model, request.user, serializer.validated_data['recipes']
+            ).items()
+        ])
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-bulk',
+    )
+    def favorite_bulk(self, request):
+        return self.change_collection(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.change_collection(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        parser_classes=[BulkJSONParser],
+    )
+    def bulk(self, request):
+        """Создать пачку рецептов; ответ — результат по каждому рецепту.
+
+        Созданные рецепты и ошибки идут в порядке запроса. Статус 201,
+        если созданы все, 400 — если ни одного, иначе 207.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            raise ValidationError('Ожидался непустой список рецептов.')
+        if len(request.data) > settings.RECIPE_BULK_MAX_SIZE:
+            raise ValidationError(
+                'В пачке больше '
+                f'{settings.RECIPE_BULK_MAX_SIZE} рецептов.'
+            )
+        results = create_recipes(
+            request.data, request.user, self.get_serializer_context()
+        )
+        created = sum(recipe is not None for recipe, _ in results)
+        return Response(
+            [
+                {'errors': errors} if errors
+                else DisplayRecipesSerializer(recipe).data
+                for recipe, errors in results
+            ],
+            status=(
+                status.HTTP_201_CREATED if created == len(results)
+                else status.HTTP_207_MULTI_STATUS if created
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+
     @action(
         detail=False, methods=['get'], permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        recipe_ingredients = RecipeIngredient.objects.filter(
-            recipe__shoppingcarts__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(
-            amount=Sum('amount')
-        ).order_by('ingredient__name')
-        recipes = Recipe.objects.filter(
-            shoppingcarts__user=request.user
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            raise ValidationError(
+                f'Доступные форматы: {", ".join(SHOPPING_LIST_FORMATS)}.'
+            )
+        render, content_type = SHOPPING_LIST_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(shopping_list_rows(request.user)),
+            content_type=content_type
         )
-        return FileResponse(
-            generate_shopping_list(recipe_ingredients, recipes),
-            as_attachment=True,
-            content_type='txt',
-            filename=f'{datetime.now()}_shopping_list.txt'
+        response['Content-Disposition'] = (
+            f'attachment; filename="{datetime.now():%Y-%m-%d_%H-%M-%S}'
+            f'_shopping_list.{file_format}"'
         )
+        return response
 
     @action(
         methods=['get'],
@@ -189,14 +343,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='get_link',
     )
     def get_link(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        if not 0 < pk <= MAX_PK_VALUE or not recipe_ids.exists(pk):
+            raise Http404
         short_link = request.build_absolute_uri(
-            reverse('shortlink', current_app='backend', args=[recipe.id])
+            reverse('shortlink', args=[short_links.encode(pk)])
         )
         return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(TableConditionalMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = (AllowAny, )
     serializer_class = TagSerializer
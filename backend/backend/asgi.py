@@ -8,9 +8,92 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
+from itertools import islice
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+
+from backend.db.pool import close_pools
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+# Частей потокового ответа, которые собираются за один переход в поток.
+STREAM_BATCH = 64
+
+
+class FoodgramASGIHandler(ASGIHandler):
+    """ASGIHandler с асинхронными маршрутами backend/asgi_urls.py.
+
+    Потоковые ответы (список покупок) Django 3.2 перебирает прямо в цикле
+    событий, а итератор читает базу; здесь части собираются в общем
+    потоке, а медленный клиент ждёт в цикле событий, не занимая поток.
+    При остановке сервера закрываются свободные соединения пула.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for alias in settings.DATABASES:
+                    await sync_to_async(close_pools)(alias)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = 'backend.asgi_urls'
+        return request, error_response
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str) else header,
+                value.encode('latin1') if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        next_parts = sync_to_async(
+            lambda: list(islice(parts, STREAM_BATCH)), thread_sensitive=True
+        )
+        try:
+            while True:
+                batch = await next_parts()
+                if not batch:
+                    break
+                for part in batch:
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+
+django.setup(set_prefix=False)
+application = FoodgramASGIHandler()
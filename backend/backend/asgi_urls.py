@@ -0,0 +1,16 @@
+"""Маршруты ASGI: частые запросы чтения обслуживают асинхронные представления.
+
+Остальные маршруты те же, что в backend/urls.py.
+"""
+from django.urls import path
+
+from api import async_views
+from recipes.views import get_recipe_by_short_link_async
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/tags/', async_views.tag_list),
+    path('api/ingredients/', async_views.ingredient_list),
+    path('api/recipes/', async_views.recipe_list),
+    path('s/<str:code>/', get_recipe_by_short_link_async),
+] + sync_urlpatterns
@@ -0,0 +1,246 @@
+"""Пул соединений с базой данных в памяти процесса.
+
+Django закрывает соединение в конце запроса (CONN_MAX_AGE = 0) или держит
+по соединению на поток. Обёртки из этого пакета вместо закрытия
+возвращают соединение в пул, а новое берут из него: запрос не тратит
+время на подключение, а потоков и задач ASGI может быть больше, чем
+соединений.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class ConnectionPool:
+    """Не больше max_size открытых соединений одной базы.
+
+    Соединение старше max_lifetime секунд закрывается вместо выдачи или
+    возврата. Соединение, простоявшее в пуле дольше check_idle секунд,
+    перед выдачей проверяется запросом SELECT 1. Если все соединения
+    заняты, выдача ждёт до timeout секунд.
+    """
+
+    def __init__(self, max_size, max_lifetime, check_idle, timeout):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        # Свободные соединения: (соединение, создано, возвращено).
+        self.idle = deque()
+        self.created_at = {}
+        self.pid = os.getpid()
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.broken = 0
+        self.waits = 0
+
+    def acquire(self, connect, error):
+        """Свободное соединение или новое от connect().
+
+        error — исключение драйвера, которое бросается, если соединение
+        не освободилось за timeout секунд.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and len(self.created_at) >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise error(
+                            f'Все {self.max_size} соединений пула заняты.'
+                        )
+                    self.waits += 1
+                    self.condition.wait(remaining)
+                if not self.idle:
+                    # Место занимается до подключения, чтобы параллельные
+                    # запросы не превысили max_size.
+                    placeholder = object()
+                    self.created_at[id(placeholder)] = None
+                    break
+                # Последнее возвращённое соединение — скорее всего, рабочее.
+                connection, created_at, returned_at = self.idle.pop()
+            now = time.monotonic()
+            if now - created_at > self.max_lifetime:
+                self.discard(connection, 'recycled')
+            elif now - returned_at > self.check_idle and not is_usable(
+                connection
+            ):
+                self.discard(connection, 'broken')
+            else:
+                with self.condition:
+                    self.reused += 1
+                return connection
+        try:
+            connection = connect()
+        except BaseException:
+            with self.condition:
+                del self.created_at[id(placeholder)]
+                self.condition.notify()
+            raise
+        with self.condition:
+            del self.created_at[id(placeholder)]
+            self.created_at[id(connection)] = time.monotonic()
+            self.created += 1
+        return connection
+
+    def release(self, connection):
+        """Вернуть соединение, отменив незавершённую транзакцию."""
+        created_at = self.created_at.get(id(connection))
+        if created_at is None:
+            # Соединение из пула родительского процесса.
+            close_quietly(connection)
+            return
+        if time.monotonic() - created_at > self.max_lifetime:
+            self.discard(connection, 'recycled')
+            return
+        try:
+            connection.rollback()
+        except Exception:
+            self.discard(connection, 'broken')
+            return
+        now = time.monotonic()
+        with self.condition:
+            self.idle.append((connection, created_at, now))
+            self.condition.notify()
+            # Пул выдаёт последние возвращённые соединения; давно не
+            # выдававшиеся закрываются здесь по истечении срока жизни.
+            expired = []
+            while self.idle and now - self.idle[0][1] > self.max_lifetime:
+                expired.append(self.idle.popleft()[0])
+        for connection in expired:
+            self.discard(connection, 'recycled')
+
+    def discard(self, connection, counter=None):
+        """Закрыть соединение и освободить его место в пуле."""
+        close_quietly(connection)
+        with self.condition:
+            self.created_at.pop(id(connection), None)
+            if counter:
+                setattr(self, counter, getattr(self, counter) + 1)
+            self.condition.notify()
+
+    def close_idle(self):
+        """Закрыть свободные соединения, например при остановке процесса."""
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+        for connection, _, _ in idle:
+            self.discard(connection)
+
+    def stats(self):
+        with self.condition:
+            size = len(self.created_at)
+            idle = len(self.idle)
+        checkouts = self.created + self.reused
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'max_size': self.max_size,
+            'created': self.created,
+            'reused': self.reused,
+            'recycled': self.recycled,
+            'broken': self.broken,
+            'waits': self.waits,
+            'reuse_rate': self.reused / checkouts if checkouts else 0.0,
+        }
+
+
+def is_usable(connection):
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(key):
+    """Пул для key — (псевдоним базы, имя базы) — в текущем процессе.
+
+    Имя входит в ключ, потому что тесты и замеры подменяют базу у того же
+    псевдонима. После fork (gunicorn --preload) соединения родителя не
+    используются: процесс заводит свой пул.
+    """
+    pool = pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = pools[key] = ConnectionPool(
+                settings.DB_POOL_SIZE,
+                settings.DB_POOL_MAX_LIFETIME,
+                settings.DB_POOL_CHECK_IDLE,
+                settings.DB_POOL_TIMEOUT,
+            )
+        return pool
+
+
+def close_pools(alias):
+    """Закрыть свободные соединения всех баз псевдонима alias."""
+    for key, pool in list(pools.items()):
+        if key[0] == alias:
+            pool.close_idle()
+
+
+def pool_stats():
+    """Метрики пулов: {'псевдоним:имя базы': stats}."""
+    return {
+        f'{alias}:{name}': pool.stats()
+        for (alias, name), pool in list(pools.items())
+    }
+
+
+class PooledDatabaseWrapperMixin:
+    """Подключение берёт соединение из пула, закрытие возвращает его.
+
+    Соединение, на котором были ошибки и которое не отвечает, а также
+    закрытое внутри atomic, в пул не возвращается.
+    """
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        self.pool_key = self.alias, str(self.settings_dict['NAME'])
+        return get_pool(self.pool_key).acquire(
+            lambda: connect(conn_params), self.Database.OperationalError
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = get_pool(self.pool_key)
+        if self.in_atomic_block:
+            # Обёртка держит соединение до выхода из atomic, отдавать его
+            # другому потоку нельзя.
+            pool.discard(self.connection)
+        elif self.errors_occurred and not self.is_usable():
+            pool.discard(self.connection, 'broken')
+        else:
+            pool.release(self.connection)
+
+
+class PooledCreationMixin:
+    """Тестовая база удаляется после закрытия соединений с ней в пуле."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
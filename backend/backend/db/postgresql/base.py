@@ -0,0 +1,18 @@
+"""PostgreSQL с пулом соединений процесса."""
+from django.db.backends.postgresql import base, creation
+
+from ..pool import PooledCreationMixin, PooledDatabaseWrapperMixin
+
+
+class DatabaseCreation(PooledCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # Для соединения из пула get_new_connection драйвера не вызывался.
+        self.isolation_level = connection.isolation_level
+        return connection
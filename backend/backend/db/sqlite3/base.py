@@ -0,0 +1,12 @@
+"""SQLite с пулом соединений процесса (для локальной разработки)."""
+from django.db.backends.sqlite3 import base, creation
+
+from ..pool import PooledCreationMixin, PooledDatabaseWrapperMixin
+
+
+class DatabaseCreation(PooledCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
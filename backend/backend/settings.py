@@ -63,22 +63,45 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
+# Пул соединений процесса (backend/db/pool.py): наибольшее число соединений,
+# срок жизни соединения, простой, после которого соединение проверяется перед
+# выдачей, и ожидание свободного соединения (секунды). С пулом соединение
+# возвращается в него в конце каждого запроса (DB_CONN_MAX_AGE = 0), это
+# безопасно и для WSGI, и для ASGI.
+DB_POOL = os.getenv('DB_POOL', default='True') == 'True'
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', default=10))
+DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', default=1800))
+DB_POOL_CHECK_IDLE = float(os.getenv('DB_POOL_CHECK_IDLE', default=10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', default=10))
+# Без пула соединение живёт в потоке DB_CONN_MAX_AGE секунд.
+DB_CONN_MAX_AGE = int(
+    os.getenv('DB_CONN_MAX_AGE', default=0 if DB_POOL else 60)
+)
+
 if os.getenv('SQLITE', default=False) == 'True':
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': (
+                'backend.db.sqlite3' if DB_POOL
+                else 'django.db.backends.sqlite3'
+            ),
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
         }
     }
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': (
+                'backend.db.postgresql' if DB_POOL
+                else 'django.db.backends.postgresql'
+            ),
             'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
             'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
             'HOST': os.getenv('DB_HOST', 'db'),
-            'PORT': os.getenv('DB_PORT', 5432)
+            'PORT': os.getenv('DB_PORT', 5432),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
         }
     }
 
@@ -116,12 +139,17 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     "DEFAULT_PAGINATION_CLASS": "api.paginators.PageLimitPaginator",
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    ]
+    ],
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.LimitedJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 AUTH_USER_MODEL = 'recipes.FoodgramUser'
@@ -141,4 +169,50 @@ DJOSER = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+RECIPE_CACHE_SIZE = int(os.getenv('RECIPE_CACHE_SIZE', default=1000))
+
+FOLLOW_CACHE_SIZE = int(os.getenv('FOLLOW_CACHE_SIZE', default=10000))
+
+# Кэш токенов: число записей, время жизни записи и как часто (в секундах)
+# читается журнал изменений пользователей из других процессов.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=300))
+TOKEN_CACHE_REFRESH = float(os.getenv('TOKEN_CACHE_REFRESH', default=1))
+
+# Потоки и процессы для уменьшенных копий картинок; 0 — строить их сразу
+# в запросе.
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+# Ограничения для картинок в base64: размер файла в байтах и число точек.
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', default=20 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv('IMAGE_UPLOAD_MAX_PIXELS', default=50_000_000)
+)
+# Наибольшее тело JSON-запроса: картинка в base64 и остальные поля.
+JSON_BODY_MAX_SIZE = int(os.getenv(
+    'JSON_BODY_MAX_SIZE', default=IMAGE_UPLOAD_MAX_SIZE * 4 // 3 + 1024 * 1024
+))
+# Пачка рецептов в POST /api/recipes/bulk/: число рецептов и тело запроса.
+RECIPE_BULK_MAX_SIZE = int(os.getenv('RECIPE_BULK_MAX_SIZE', default=100))
+RECIPE_BULK_BODY_MAX_SIZE = int(
+    os.getenv('RECIPE_BULK_BODY_MAX_SIZE', default=64 * 1024 * 1024)
+)
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INGREDIENT_INDEX_REFRESH = int(
+    os.getenv('INGREDIENT_INDEX_REFRESH', default=60)
+)
+
+TAG_MAP_REFRESH = int(os.getenv('TAG_MAP_REFRESH', default=60))
+
+# Как часто (в секундах) карта id рецептов для коротких ссылок сверяется
+# с таблицей, и сколько секунд клиенты могут кэшировать переход по ссылке.
+RECIPE_IDS_REFRESH = int(os.getenv('RECIPE_IDS_REFRESH', default=60))
+SHORT_LINK_MAX_AGE = int(os.getenv('SHORT_LINK_MAX_AGE', default=3600))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
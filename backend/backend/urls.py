@@ -7,7 +7,9 @@ from recipes.views import get_recipe_by_short_link
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('recipes/<int:pk>/', get_recipe_by_short_link, name='recipes-detail'),
+    path(
+        'recipes/<str:code>/', get_recipe_by_short_link, name='recipes-detail'
+    ),
     path('api/', include('api.urls')),
     path('s/', include('recipes.urls')),
 ]
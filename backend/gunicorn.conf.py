@@ -0,0 +1,16 @@
+"""Настройки gunicorn.
+
+SERVER_INTERFACE=wsgi (по умолчанию) — синхронные процессы на
+backend.wsgi; asgi — процессы uvicorn на backend.asgi, в которых
+медленные клиенты не занимают процесс. Число процессов задаёт
+WEB_CONCURRENCY.
+"""
+import os
+
+bind = '0.0.0.0:11000'
+
+if os.getenv('SERVER_INTERFACE', default='wsgi') == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
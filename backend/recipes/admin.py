@@ -1,8 +1,11 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
+from django.core.files.storage import default_storage
 from django.utils.safestring import mark_safe
 
+from . import shopping_lists
 from .models import (
     Favorite, Tag, Ingredient, Recipe,
     RecipeIngredient, ShoppingCart, Subscription, FoodgramUser
@@ -12,8 +15,35 @@ from .models import (
 admin.site.unregister(Group)
 
 
+class CountedKeysReadOnlyMixin:
+    """Внешние ключи сохранённой записи не правятся.
+
+    Счётчики и списки покупок меняются сигналами при создании и удалении
+    записи; правка ключа не перенесла бы их со старой цели на новую.
+    """
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is None:
+            return readonly_fields
+        return (*readonly_fields, *(
+            field.name for field in self.model._meta.concrete_fields
+            if field.many_to_one
+        ))
+
+
+class IngredientInlineForm(forms.ModelForm):
+    """Продукт сохранённой строки не правится: см. CountedKeysReadOnlyMixin."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            self.fields['ingredient'].disabled = True
+
+
 class IngredientInline(admin.TabularInline):
     model = RecipeIngredient
+    form = IngredientInlineForm
 
 
 class CookingTimeFilter(admin.SimpleListFilter):
@@ -64,13 +94,13 @@ class IngredientAdmin(admin.ModelAdmin):
         'measurement_unit'
     )
 
-    @admin.display(description='Рецепты')
+    @admin.display(description='Рецепты', ordering='recipes_count')
     def get_recipes(self, ingredient):
-        return ingredient.recipes.count()
+        return ingredient.recipes_count
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(CountedKeysReadOnlyMixin, admin.ModelAdmin):
     inlines = [IngredientInline]
 
     list_display = (
@@ -92,6 +122,10 @@ class RecipeAdmin(admin.ModelAdmin):
         CookingTimeFilter
     )
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        shopping_lists.rebuild_for_recipe(form.instance.pk)
+
     @admin.display(description='Тэги')
     def get_tags(self, recipe):
         return mark_safe('<br> '.join(
@@ -107,19 +141,23 @@ class RecipeAdmin(admin.ModelAdmin):
             for ingredient in recipe.recipe_ingredients.all()])
         )
 
-    @admin.display(description='В избранном')
-    def favorites_count(self, recipes):
-        return recipes.favorites.count()
+    @admin.display(description='В избранном', ordering='favorites_count')
+    def favorites_count(self, recipe):
+        return recipe.favorites_count
 
     @admin.display(description='Изображение')
-    def image_preview(self, url):
+    def image_preview(self, recipe):
+        thumbnail = recipe.image_variants.get('thumbnail')
         return mark_safe(
-            f'<img src="{url.image.url}" width=40 height=40 />'
+            '<img src="{}" width=40 height=40 />'.format(
+                default_storage.url(thumbnail['jpeg']) if thumbnail
+                else recipe.image.url
+            )
         )
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(CountedKeysReadOnlyMixin, admin.ModelAdmin):
     list_display = (
         'subscribed_to',
         'subscriber'
@@ -146,30 +184,44 @@ class FoodgramUserAdmin(UserAdmin):
         'is_active'
     )
 
-    @admin.display(description='Рецепты')
+    @admin.display(description='Рецепты', ordering='recipes_count')
     def get_recipes_count(self, user):
-        return user.recipes.count()
+        return user.recipes_count
 
-    @admin.display(description='Подписчики')
+    @admin.display(description='Подписчики', ordering='subscribers_count')
     def get_subscribers(self, user):
-        return user.subscribers.count()
+        return user.subscribers_count
 
-    @admin.display(description='Подписки')
+    @admin.display(description='Подписки', ordering='subscriptions_count')
     def get_subscriptions(self, user):
-        return user.authors.count()
+        return user.subscriptions_count
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(CountedKeysReadOnlyMixin, admin.ModelAdmin):
     list_display = (
         'ingredient',
         'recipe',
         'amount'
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        shopping_lists.rebuild_for_recipe(obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        shopping_lists.rebuild_for_recipe(obj.recipe_id)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for recipe_id in recipe_ids:
+            shopping_lists.rebuild_for_recipe(recipe_id)
+
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(CountedKeysReadOnlyMixin, admin.ModelAdmin):
     list_display = (
         'user',
         'recipe'
@@ -177,7 +229,7 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(CountedKeysReadOnlyMixin, admin.ModelAdmin):
     list_display = (
         'user',
         'recipe'
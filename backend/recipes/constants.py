@@ -5,3 +5,5 @@ TEXT_LIMIT = 20
 USER_MAX_LENGTH = 150
 USERNAME_PATTERN = r'[^\w.@+-]'
 EMAIL_MAX_LENGTH = 254
+# Наибольший id (BigAutoField); id больше него заведомо неверны.
+MAX_PK_VALUE = 2 ** 63 - 1
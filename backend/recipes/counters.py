@@ -0,0 +1,122 @@
+"""Денормализованные счётчики рецептов, пользователей и продуктов."""
+from collections import Counter, defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Favorite, FoodgramUser, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription
+)
+
+
+# (модель со счётчиком, поле счётчика, считаемая модель, внешний ключ)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_carts_count', ShoppingCart, 'recipe'),
+    (FoodgramUser, 'recipes_count', Recipe, 'author'),
+    (FoodgramUser, 'subscribers_count', Subscription, 'subscribed_to'),
+    (FoodgramUser, 'subscriptions_count', Subscription, 'subscriber'),
+    (Ingredient, 'recipes_count', RecipeIngredient, 'ingredient'),
+)
+
+COUNTED_MODELS = tuple({source for _, _, source, _ in COUNTERS})
+
+
+def change_counters(source, objects, delta):
+    """Изменить счётчики на delta для каждого объекта модели source.
+
+    Вызывается сигналами для одиночных записей и вручную после
+    bulk_create и массового удаления, которые сигналов не отправляют.
+    Объекты с одинаковой кратностью обновляются одним запросом.
+    """
+    objects = list(objects)
+    for model, field, counted, key in COUNTERS:
+        if counted is not source:
+            continue
+        multiplicity = Counter(
+            getattr(instance, f'{key}_id') for instance in objects
+        )
+        groups = defaultdict(list)
+        for pk, times in multiplicity.items():
+            groups[times].append(pk)
+        for times, pks in groups.items():
+            model.objects.filter(pk__in=pks).update(**{
+                field: F(field) + delta * times
+            })
+
+
+def delete_counted(source, objects):
+    """Удалить объекты модели source одним запросом и уменьшить счётчики.
+
+    DELETE выполняется без сигналов pre_delete и post_delete на каждую
+    строку; остальные последствия удаления (списки покупок) вызывающий
+    код переносит сам.
+    """
+    objects = list(objects)
+    if not objects:
+        return
+    connection = connections[router.db_for_write(source)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(source._meta.db_table)} '
+            f'WHERE {quote(source._meta.pk.column)} IN '
+            f'({", ".join(["%s"] * len(objects))})',
+            [instance.pk for instance in objects]
+        )
+    change_counters(source, objects, -1)
+
+
+def actual_count(model, field):
+    """Подзапрос с фактическим значением счётчика."""
+    for counter_model, counter_field, counted, key in COUNTERS:
+        if counter_model is model and counter_field == field:
+            return Coalesce(
+                Subquery(
+                    counted.objects.filter(**{key: OuterRef('pk')})
+                    .order_by()
+                    .values(key)
+                    .annotate(total=Count('pk'))
+                    .values('total')
+                ),
+                Value(0)
+            )
+    raise LookupError(f'Нет счётчика {model.__name__}.{field}.')
+
+
+def repair_counters(model, fields, batch_size, dry_run=False):
+    """Пересчитать счётчики пачками и исправить расхождения.
+
+    Возвращает число исправленных записей.
+    """
+    repaired = 0
+    last_pk = None
+    while True:
+        batch = model.objects.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(
+            batch.annotate(**{
+                f'actual_{field}': actual_count(model, field)
+                for field in fields
+            }).only('pk', *fields)[:batch_size]
+        )
+        if not batch:
+            return repaired
+        last_pk = batch[-1].pk
+        drifted = []
+        for instance in batch:
+            changed = False
+            for field in fields:
+                actual = getattr(instance, f'actual_{field}')
+                if getattr(instance, field) != actual:
+                    setattr(instance, field, actual)
+                    changed = True
+            if changed:
+                drifted.append(instance)
+        if drifted and not dry_run:
+            with transaction.atomic():
+                model.objects.bulk_update(drifted, fields)
+        repaired += len(drifted)
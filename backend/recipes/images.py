@@ -0,0 +1,224 @@
+"""Уменьшенные копии картинок рецептов и аватаров.
+
+Копии строятся после сохранения записи: поток из пула процесса читает
+файл и сохраняет результат, а сжатие и кодирование идут в отдельных
+процессах и не занимают GIL обработчиков запросов. Запрос на загрузку
+не ждёт обработки картинки; пока копий нет, клиенты получают исходную.
+"""
+import logging
+import multiprocessing
+import os
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Размер копии: (ширина, высота). Картинка обрезается по центру.
+VARIANT_SIZES = {
+    'thumbnail': (96, 96),
+    'card': (480, 360),
+}
+# Формат: (расширение файла, параметры сохранения Pillow).
+VARIANT_FORMATS = {
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+}
+# Модель: (поле картинки, поле с именами файлов копий).
+IMAGE_FIELDS = {
+    'recipes.Recipe': ('image', 'image_variants'),
+    'recipes.FoodgramUser': ('avatar', 'avatar_variants'),
+}
+
+executor = None
+process_pool = None
+executor_lock = Lock()
+# Записи, копии которых отложены до выхода из deferred_variants().
+deferred = None
+
+
+def flatten(image):
+    """Картинка без прозрачности на белом фоне — для JPEG."""
+    if image.mode == 'RGB':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_variants(data):
+    """Копии картинки: {вариант: {формат: содержимое файла}}."""
+    image = Image.open(BytesIO(data))
+    # JPEG сразу декодируется в уменьшенном масштабе, не меньше копий.
+    side = max(max(size) for size in VARIANT_SIZES.values())
+    image.draft('RGB', (side, side))
+    image.load()
+    image = ImageOps.exif_transpose(image)
+    image = image.convert(
+        'RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB'
+    )
+    rendered = {}
+    for variant, size in VARIANT_SIZES.items():
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        rendered[variant] = {}
+        for image_format, (_, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            frame = flatten(resized) if image_format == 'jpeg' else resized
+            frame.save(buffer, image_format.upper(), **options)
+            rendered[variant][image_format] = buffer.getvalue()
+    return rendered
+
+
+def save_variants(name, rendered):
+    """Сохранить копии рядом с картинкой name.
+
+    Возвращает {'source': name, вариант: {формат: имя файла}}.
+    """
+    stem = os.path.splitext(name)[0]
+    variants = {'source': name}
+    for variant, files in rendered.items():
+        variants[variant] = {
+            image_format: default_storage.save(
+                f'{stem}_{variant}.{VARIANT_FORMATS[image_format][0]}',
+                ContentFile(content)
+            )
+            for image_format, content in files.items()
+        }
+    return variants
+
+
+def delete_variants(variants):
+    for variant, files in variants.items():
+        if variant != 'source':
+            for name in files.values():
+                default_storage.delete(name)
+
+
+def needs_variants(instance):
+    image_field, variants_field = IMAGE_FIELDS[instance._meta.label]
+    name = getattr(instance, image_field).name
+    return bool(name) and getattr(instance, variants_field).get(
+        'source'
+    ) != name
+
+
+def build_variants(model, pk, force=False, render=render_variants):
+    """Построить копии картинки записи, если картинка ещё не обработана.
+
+    Время изменения записи (поля auto_now) сдвигается вместе с копиями,
+    чтобы устарели кэши с её представлением.
+    """
+    image_field, variants_field = IMAGE_FIELDS[model._meta.label]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not (
+        needs_variants(instance)
+        or force and getattr(instance, image_field).name
+    ):
+        return
+    name = getattr(instance, image_field).name
+    try:
+        with default_storage.open(name) as file:
+            variants = save_variants(name, render(file.read()))
+    except (OSError, ValueError) as error:
+        logger.warning('Не удалось обработать картинку %s: %s', name, error)
+        return
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        if instance is None or getattr(instance, image_field).name != name:
+            delete_variants(variants)
+            return
+        old_variants = getattr(instance, variants_field)
+        setattr(instance, variants_field, variants)
+        instance.save(update_fields=[variants_field] + [
+            field.name for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ])
+    delete_variants(old_variants)
+
+
+def render_in_process(data):
+    return get_process_pool().submit(render_variants, data).result()
+
+
+def build_in_worker(model, pk):
+    try:
+        build_variants(model, pk, render=render_in_process)
+    except Exception:
+        logger.exception('Ошибка при построении копий картинки %s', pk)
+    finally:
+        connection.close()
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='image-variants'
+            )
+        return executor
+
+
+def get_process_pool():
+    """Процессы для обработки картинок.
+
+    Запускаются методом spawn: fork процесса с потоками и открытыми
+    соединениями с базой данных небезопасен.
+    """
+    global process_pool
+    with executor_lock:
+        if process_pool is None:
+            process_pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return process_pool
+
+
+def schedule_variants(instance):
+    """Построить копии записи после фиксации текущей транзакции."""
+    model, pk = type(instance), instance.pk
+    if deferred is not None:
+        transaction.on_commit(lambda: deferred.append((model, pk)))
+    elif settings.IMAGE_WORKERS <= 0:
+        transaction.on_commit(lambda: build_variants(model, pk))
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(build_in_worker, model, pk)
+        )
+
+
+def wait_for_variants():
+    """Дождаться построения всех запланированных копий."""
+    global executor, process_pool
+    with executor_lock:
+        pools = (executor, process_pool)
+        executor = process_pool = None
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+@contextmanager
+def deferred_variants():
+    """Копии записей, сохранённых внутри блока, строятся при выходе из него.
+
+    Для массовых операций и замеров: копии каждой записи строятся один
+    раз и не конкурируют с сохранением остальных записей.
+    """
+    global deferred
+    previous, deferred = deferred, []
+    try:
+        yield
+    finally:
+        scheduled, deferred = deferred, previous
+    for model, pk in dict.fromkeys(scheduled):
+        build_variants(model, pk)
@@ -0,0 +1,485 @@
+"""Команда для замера числа SQL-запросов, времени и размера ответов API."""
+import base64
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment,
+    teardown_test_environment
+)
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.cache import recipe_cache, recipe_ids, tag_map
+from api.follows import follow_cache
+from api.ingredient_index import ingredient_index
+from api.paginators import PageLimitPaginator
+from recipes import short_links
+from recipes.counters import change_counters
+from recipes.images import deferred_variants
+from recipes.models import (
+    Favorite, FoodgramUser, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription, Tag
+)
+
+
+BASELINE_FILE = os.path.join(
+    settings.BASE_DIR, 'data', 'benchmark_baseline.json'
+)
+
+DISHES = (
+    'Пирог с капустой', 'Борщ', 'Щи', 'Блины', 'Сырники', 'Плов',
+    'Пельмени', 'Овощное рагу', 'Куриный суп', 'Гречка с грибами',
+)
+
+# Сценарии, в ответе которых набор данных гарантирует непустой список:
+# пустая страница значит, что сломан поиск или фильтр, а не что стало
+# быстрее.
+NOT_EMPTY = frozenset((
+    'users-list-auth', 'users-subscriptions', 'recipes-list',
+    'recipes-list-deep-page', 'recipes-list-cursor-deep',
+    'recipes-filter-author', 'recipes-filter-tags',
+    'recipes-filter-is-favorited', 'recipes-filter-is-in-shopping-cart',
+    'recipes-search', 'recipes-search-filtered', 'ingredients-list',
+    'ingredients-search', 'tags-list',
+))
+
+
+def make_png(size=(64, 64)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_image(size=(64, 64)):
+    """Картинка в формате data URI для полей Base64ImageField."""
+    return 'data:image/png;base64,' + base64.b64encode(
+        make_png(size)
+    ).decode()
+
+
+class Dataset:
+    """Воспроизводимый набор данных для замеров."""
+
+    def __init__(self, users, recipes, seed, tags=6):
+        self.random = random.Random(seed)
+        self.image = make_image()
+        self.tags = [
+            Tag.objects.create(name=f'Тэг {index}', slug=f'tag{index}')
+            for index in range(tags)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'продукт {index}', measurement_unit='г')
+            for index in range(300)
+        )
+        self.ingredients = list(Ingredient.objects.all())
+        image = default_storage.save(
+            'media/images/bench.png', ContentFile(make_png())
+        )
+        self.users = [
+            FoodgramUser.objects.create_user(
+                username=f'user{index}',
+                email=f'user{index}@example.com',
+                password='bench-password',
+                first_name='Имя',
+                last_name='Фамилия',
+            ) for index in range(users)
+        ]
+        self.user, self.author = self.users[0], self.users[1]
+        self.recipes = []
+        for index in range(recipes):
+            recipe = Recipe(
+                author=self.random.choice(self.users[1:]),
+                name=f'{self.random.choice(DISHES)} {index}',
+                text='Описание рецепта. ' * 10,
+                cooking_time=self.random.randint(1, 120),
+                image=image,
+            )
+            recipe.save()
+            recipe.tags.set(self.random.sample(self.tags, 2))
+            ingredients = RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient,
+                    amount=self.random.randint(1, 500)
+                ) for ingredient in self.random.sample(self.ingredients, 8)
+            )
+            change_counters(RecipeIngredient, ingredients, 1)
+            self.recipes.append(recipe)
+        self.recipe = self.recipes[0]
+        for recipe in self.recipes[::3]:
+            Favorite.objects.create(user=self.user, recipe=recipe)
+        for recipe in self.recipes[::5]:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        for author in self.users[2:]:
+            Subscription.objects.create(
+                subscriber=self.user, subscribed_to=author
+            )
+        self.token = Token.objects.create(user=self.user).key
+        self.author_token = Token.objects.create(user=self.author).key
+
+    def client(self, token=None):
+        client = APIClient()
+        if token:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return client
+
+    def recipe_payload(self):
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': self.image,
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients[:8]
+            ],
+        }
+
+
+def get_scenarios(data):
+    """Сценарии по всем маршрутам api/urls.py и короткой ссылке.
+
+    Каждый сценарий: имя, токен, метод, адрес, тело запроса и
+    необязательная подготовка, которая не входит в замер.
+    """
+    user, author, recipe = data.user, data.author, data.recipe
+    own_recipe = Recipe.objects.filter(author=author).first()
+    tags = '&'.join(f'tags={tag.slug}' for tag in data.tags[:2])
+    many_tags = '&'.join(f'tags={tag.slug}' for tag in data.tags[:5])
+    deep = Recipe.objects.order_by('-published_at', '-id')[
+        len(data.recipes) - 10
+    ]
+    deep_cursor = PageLimitPaginator().encode_cursor(
+        [deep.published_at.isoformat(), str(deep.id)]
+    )
+
+    def unsubscribe():
+        Subscription.objects.filter(
+            subscriber=user, subscribed_to=author
+        ).delete()
+
+    def subscribe():
+        Subscription.objects.get_or_create(
+            subscriber=user, subscribed_to=author
+        )
+
+    def remove_favorite():
+        Favorite.objects.filter(user=user, recipe=recipe).delete()
+
+    def add_favorite():
+        Favorite.objects.get_or_create(user=user, recipe=recipe)
+
+    def remove_from_cart():
+        ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
+
+    def add_to_cart():
+        ShoppingCart.objects.get_or_create(user=user, recipe=recipe)
+
+    menu = [item.pk for item in data.recipes[:10]]
+
+    def clear_cart():
+        ShoppingCart.objects.filter(user=user, recipe_id__in=menu).delete()
+
+    def fill_cart():
+        for pk in menu:
+            ShoppingCart.objects.get_or_create(user=user, recipe_id=pk)
+
+    def new_recipe():
+        created = data.client(data.author_token).post(
+            '/api/recipes/', data.recipe_payload(), format='json'
+        )
+        return {'pk': created.data['id']}
+
+    return [
+        ('users-list', None, 'get', '/api/users/', None, None),
+        ('users-list-auth', data.token, 'get', '/api/users/', None, None),
+        ('users-detail', data.token, 'get',
+         f'/api/users/{author.id}/', None, None),
+        ('users-me', data.token, 'get', '/api/users/me/', None, None),
+        ('users-avatar-put', data.author_token, 'put',
+         '/api/users/me/avatar/', {'avatar': data.image}, None),
+        ('users-subscribe', data.token, 'post',
+         f'/api/users/{author.id}/subscribe/', None, unsubscribe),
+        ('users-unsubscribe', data.token, 'delete',
+         f'/api/users/{author.id}/subscribe/', None, subscribe),
+        ('users-subscriptions', data.token, 'get',
+         '/api/users/subscriptions/', None, None),
+        ('users-subscriptions-limit', data.token, 'get',
+         '/api/users/subscriptions/?recipes_limit=3', None, None),
+        ('users-subscriptions-cursor', data.token, 'get',
+         '/api/users/subscriptions/?cursor=', None, None),
+        ('recipes-list', None, 'get', '/api/recipes/', None, None),
+        ('recipes-list-auth', data.token, 'get',
+         '/api/recipes/', None, None),
+        ('recipes-list-limit', data.token, 'get',
+         '/api/recipes/?limit=20', None, None),
+        ('recipes-list-deep-page', data.token, 'get',
+         '/api/recipes/?page=8', None, None),
+        ('recipes-list-cursor', data.token, 'get',
+         '/api/recipes/?cursor=', None, None),
+        ('recipes-list-cursor-deep', data.token, 'get',
+         f'/api/recipes/?cursor={deep_cursor}', None, None),
+        ('recipes-filter-author', data.token, 'get',
+         f'/api/recipes/?author={author.id}', None, None),
+        ('recipes-filter-tags', data.token, 'get',
+         f'/api/recipes/?{tags}', None, None),
+        ('recipes-filter-many-tags', None, 'get',
+         f'/api/recipes/?{many_tags}', None, None),
+        ('recipes-filter-is-favorited', data.token, 'get',
+         '/api/recipes/?is_favorited=1', None, None),
+        ('recipes-filter-is-in-shopping-cart', data.token, 'get',
+         '/api/recipes/?is_in_shopping_cart=1', None, None),
+        ('recipes-filter-combined', data.token, 'get',
+         f'/api/recipes/?is_favorited=1&is_in_shopping_cart=1'
+         f'&author={author.id}&{tags}', None, None),
+        ('recipes-search', None, 'get',
+         '/api/recipes/?search=пирог капуста', None, None),
+        ('recipes-search-filtered', data.token, 'get',
+         f'/api/recipes/?search=суп&{tags}', None, None),
+        ('recipes-detail', None, 'get',
+         f'/api/recipes/{recipe.id}/', None, None),
+        ('recipes-detail-auth', data.token, 'get',
+         f'/api/recipes/{recipe.id}/', None, None),
+        ('recipes-create', data.author_token, 'post',
+         '/api/recipes/', data.recipe_payload(), None),
+        ('recipes-bulk-create', data.author_token, 'post',
+         '/api/recipes/bulk/',
+         [data.recipe_payload() for _ in range(10)], None),
+        ('recipes-update', data.author_token, 'patch',
+         f'/api/recipes/{own_recipe.id}/', data.recipe_payload(), None),
+        ('recipes-delete', data.author_token, 'delete',
+         '/api/recipes/{pk}/', None, new_recipe),
+        ('recipes-favorite', data.token, 'post',
+         f'/api/recipes/{recipe.id}/favorite/', None, remove_favorite),
+        ('recipes-unfavorite', data.token, 'delete',
+         f'/api/recipes/{recipe.id}/favorite/', None, add_favorite),
+        ('recipes-shopping-cart', data.token, 'post',
+         f'/api/recipes/{recipe.id}/shopping_cart/', None,
+         remove_from_cart),
+        ('recipes-shopping-cart-delete', data.token, 'delete',
+         f'/api/recipes/{recipe.id}/shopping_cart/', None, add_to_cart),
+        ('recipes-download-shopping-cart', data.token, 'get',
+         '/api/recipes/download_shopping_cart/', None, None),
+        *(
+            (f'recipes-download-shopping-cart-{file_format}', data.token,
+             'get',
+             f'/api/recipes/download_shopping_cart/?file_format={file_format}',
+             None, None)
+            for file_format in ('csv', 'json', 'pdf')
+        ),
+        ('recipes-shopping-cart-bulk', data.token, 'post',
+         '/api/recipes/shopping_cart/', {'recipes': menu}, clear_cart),
+        ('recipes-shopping-cart-bulk-delete', data.token, 'delete',
+         '/api/recipes/shopping_cart/', {'recipes': menu}, fill_cart),
+        ('recipes-get-link', None, 'get',
+         f'/api/recipes/{recipe.id}/get-link/', None, None),
+        ('ingredients-list', None, 'get', '/api/ingredients/', None, None),
+        ('ingredients-search', None, 'get',
+         '/api/ingredients/?name=прод', None, None),
+        ('ingredients-detail', None, 'get',
+         f'/api/ingredients/{data.ingredients[0].id}/', None, None),
+        ('tags-list', None, 'get', '/api/tags/', None, None),
+        ('tags-detail', None, 'get',
+         f'/api/tags/{data.tags[0].id}/', None, None),
+        ('short-link', None, 'get',
+         f'/s/{short_links.encode(recipe.id)}/', None, None),
+    ]
+
+
+def result_count(response):
+    """Число объектов в ответе со списком или на странице."""
+    data = getattr(response, 'data', None)
+    if isinstance(data, dict):
+        data = data.get('results')
+    return len(data) if isinstance(data, list) else None
+
+
+def response_size(response):
+    if getattr(response, 'streaming', False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run_scenario(data, token, method, url, body, prepare):
+    """Один замер сценария.
+
+    Возвращает адрес, ответ, число SQL-запросов, размер ответа и время в
+    секундах. Потоковый ответ при замере читается целиком.
+    """
+    kwargs = prepare() if prepare else None
+    path = url.format(**kwargs) if kwargs else url
+    client = data.client(token)
+    # Журнал изменений пользователей читается раз в TOKEN_CACHE_REFRESH
+    # секунд; здесь — до замера, чтобы число запросов не зависело от
+    # времени.
+    token_cache.refresh(force=True)
+    # Снимки таблиц сверяются с базой раз в минуту, а замеры идут дольше;
+    # сверка по таймеру откладывается.
+    for snapshot in (tag_map, recipe_ids, ingredient_index):
+        snapshot.checked_at = time.monotonic()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(path, body, format='json')
+        size = response_size(response)
+        elapsed = time.perf_counter() - start
+    return path, response, len(queries), size, elapsed
+
+
+class Command(BaseCommand):
+    """Замер запросов к API на тестовой базе данных.
+
+    Для каждого сценария фиксируется число SQL-запросов, медианное время
+    и размер ответа. Результат сравнивается с сохранённым эталоном
+    (data/benchmark_baseline.json), при регрессии команда завершается
+    с ошибкой.
+    """
+
+    help = 'Замер числа запросов, времени и размера ответов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=30)
+        parser.add_argument('--recipes', type=int, default=60)
+        parser.add_argument('--tags', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--baseline', default=BASELINE_FILE)
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Сохранить текущие результаты как эталон.'
+        )
+        parser.add_argument(
+            '--time-tolerance', type=float, default=2.0,
+            help='Допустимый рост времени, во сколько раз.'
+        )
+        parser.add_argument(
+            '--size-tolerance', type=float, default=1.1,
+            help='Допустимый рост размера ответа, во сколько раз.'
+        )
+        parser.add_argument(
+            '--only', nargs='*', default=None,
+            help='Запустить только перечисленные сценарии.'
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        media_root = tempfile.mkdtemp()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            # Копии картинок строятся после замеров: запросы только
+            # ставят их в очередь, как и при работе с пулом.
+            with override_settings(MEDIA_ROOT=media_root), \
+                    deferred_variants():
+                data = Dataset(
+                    options['users'], options['recipes'], options['seed'],
+                    options['tags']
+                )
+                results = self.run_scenarios(data, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.report(results)
+        self.compare(results, options)
+
+    def run_scenarios(self, data, options):
+        results = {}
+        for name, *scenario in get_scenarios(data):
+            if options['only'] and name not in options['only']:
+                continue
+            timings = []
+            for _ in range(options['repeat']):
+                path, response, queries, size, elapsed = run_scenario(
+                    data, *scenario
+                )
+                timings.append(elapsed)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{name}: {scenario[1].upper()} {path} вернул '
+                        f'{response.status_code}'
+                    )
+                if name in NOT_EMPTY and not result_count(response):
+                    raise CommandError(
+                        f'{name}: {scenario[1].upper()} {path} вернул '
+                        f'пустой список'
+                    )
+            results[name] = {
+                'queries': queries,
+                'time_ms': round(statistics.median(timings) * 1000, 2),
+                'size': size,
+            }
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"сценарий":40} {"запросы":>8} {"мс":>9} {"байт":>9}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:40} {result["queries"]:>8} '
+                f'{result["time_ms"]:>9.2f} {result["size"]:>9}'
+            )
+        self.stdout.write(f'Кэш рецептов: {recipe_cache.stats()}')
+        self.stdout.write(f'Кэш подписок: {follow_cache.stats()}')
+        self.stdout.write(f'Кэш токенов: {token_cache.stats()}')
+
+    def compare(self, results, options):
+        vendor = connection.vendor
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        if options['update_baseline']:
+            baseline.setdefault(vendor, {}).update(results)
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(baseline, file, indent=2, sort_keys=True)
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS('Эталон обновлён.'))
+            return
+        if vendor not in baseline:
+            raise CommandError(
+                f'В эталоне {options["baseline"]} нет замеров для {vendor}; '
+                'сохраните их с --update-baseline.'
+            )
+        regressions = []
+        for name, result in results.items():
+            expected = baseline[vendor].get(name)
+            if expected is None:
+                regressions.append(f'{name}: нет в эталоне')
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'> {expected["queries"]}'
+                )
+            if result['time_ms'] > (
+                expected['time_ms'] * options['time_tolerance']
+            ):
+                regressions.append(
+                    f'{name}: время {result["time_ms"]} мс '
+                    f'> {expected["time_ms"]} мс'
+                )
+            if result['size'] > expected['size'] * options['size_tolerance']:
+                regressions.append(
+                    f'{name}: размер {result["size"]} > {expected["size"]}'
+                )
+        if regressions:
+            raise CommandError(
+                'Регрессия производительности:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено.'))
@@ -0,0 +1,188 @@
+"""Команда для замера подключений к базе данных на запрос."""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.client import HTTPConnection
+from socketserver import ThreadingMixIn
+from urllib.parse import quote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+
+from backend.db.pool import PooledDatabaseWrapperMixin, get_pool
+from recipes import short_links
+from recipes.images import deferred_variants
+
+from .benchmark_api import Dataset
+
+
+@contextmanager
+def test_dataset(recipes):
+    """Тестовая база с набором данных Dataset для замеров через сервер."""
+    setup_test_environment()
+    media_root = tempfile.mkdtemp()
+    if connection.vendor == 'sqlite':
+        # База в памяти не закрывается между запросами; нужен файл.
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            media_root, 'bench.sqlite3'
+        )
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    try:
+        with override_settings(MEDIA_ROOT=media_root), deferred_variants():
+            data = Dataset(10, recipes, seed=1)
+            connection.close()
+            yield data
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """Замер запросов чтения через настоящий WSGI-сервер.
+
+    Тестовый клиент Django не закрывает соединение с базой в конце
+    запроса, поэтому запросы идут через сервер из wsgiref в потоках.
+    Считается, сколько раз за запрос открывается соединение с базой,
+    и время ответа. С --compare замер повторяется без пула и с пулом
+    (DB_POOL=False и True) в отдельных процессах.
+    """
+
+    help = 'Замер подключений к базе данных и времени запросов чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--recipes', type=int, default=60)
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Сравнить работу без пула и с пулом соединений.'
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            for pool in ('False', 'True'):
+                self.stdout.write(f'DB_POOL={pool}')
+                self.stdout.flush()
+                result = subprocess.run(
+                    [
+                        sys.executable,
+                        os.path.join(settings.BASE_DIR, 'manage.py'),
+                        'benchmark_connections',
+                        '--requests', str(options['requests']),
+                        '--concurrency', str(options['concurrency']),
+                        '--recipes', str(options['recipes']),
+                    ],
+                    env={**os.environ, 'DB_POOL': pool},
+                )
+                if result.returncode:
+                    raise CommandError(f'Замер с DB_POOL={pool} не удался.')
+            return
+        with test_dataset(options['recipes']) as data:
+            timings, opened = self.run_requests(data, options)
+        self.report(timings, opened)
+
+    def run_requests(self, data, options):
+        server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=ThreadingWSGIServer, handler_class=QuietHandler
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        paths = [
+            '/api/tags/',
+            f'/api/ingredients/?name={quote("продукт 1")}',
+            '/api/recipes/?limit=6',
+            f'/api/recipes/{data.recipe.pk}/',
+            f'/s/{short_links.encode(data.recipe.pk)}/',
+        ]
+        connects = []
+        lock = threading.Lock()
+
+        def count_connect(sender, connection, **kwargs):
+            with lock:
+                connects.append(connection.alias)
+
+        def fetch(count, timings):
+            for index in range(count):
+                start = time.perf_counter()
+                client = HTTPConnection('127.0.0.1', server.server_port)
+                client.request('GET', paths[index % len(paths)])
+                response = client.getresponse()
+                response.read()
+                client.close()
+                if response.status >= 400:
+                    raise CommandError(
+                        f'GET {paths[index % len(paths)]} вернул '
+                        f'{response.status}'
+                    )
+                timings.append(time.perf_counter() - start)
+
+        try:
+            # Прогрев: пул заполняется, кэши процесса загружаются.
+            fetch(len(paths) * options['concurrency'], [])
+            wrapper = connections[DEFAULT_DB_ALIAS]
+            pooled = isinstance(wrapper, PooledDatabaseWrapperMixin)
+            pool = get_pool(
+                (wrapper.alias, str(wrapper.settings_dict['NAME']))
+            ) if pooled else None
+            created = pool.created if pooled else 0
+            connection_created.connect(count_connect)
+            timings = []
+            per_thread = options['requests'] // options['concurrency']
+            threads = [
+                threading.Thread(target=fetch, args=(per_thread, timings))
+                for _ in range(options['concurrency'])
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - start
+        finally:
+            connection_created.disconnect(count_connect)
+            server.shutdown()
+            server.server_close()
+        opened = pool.created - created if pooled else len(connects)
+        self.checkouts = len(connects)
+        self.pool_stats = pool.stats() if pooled else None
+        return timings, opened
+
+    def report(self, timings, opened):
+        self.stdout.write(
+            f'запросов: {len(timings)}, '
+            f'{len(timings) / self.elapsed:.0f} в с, '
+            f'медиана {statistics.median(timings) * 1000:.2f} мс, '
+            f'95% {statistics.quantiles(timings, n=20)[-1] * 1000:.2f} мс'
+        )
+        self.stdout.write(
+            f'подключений к базе на запрос: {opened / len(timings):.2f} '
+            f'(выдач соединения: {self.checkouts / len(timings):.2f})'
+        )
+        if self.pool_stats is not None:
+            self.stdout.write(f'Пул соединений: {self.pool_stats}')
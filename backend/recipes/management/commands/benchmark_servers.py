@@ -0,0 +1,202 @@
+"""Команда для сравнения пропускной способности WSGI и ASGI."""
+import json
+import socket
+import statistics
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import quote
+from wsgiref.simple_server import WSGIServer, make_server
+
+import uvicorn
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from backend.asgi import application as asgi_application
+from recipes import short_links
+
+from .benchmark_connections import QuietHandler, test_dataset
+
+
+class BacklogWSGIServer(WSGIServer):
+    # Очередь подключений как у gunicorn, а не пять по умолчанию.
+    request_queue_size = 2048
+
+
+def start_wsgi():
+    """Один синхронный процесс: как gunicorn --worker-class sync."""
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(),
+        server_class=BacklogWSGIServer, handler_class=QuietHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+
+    return server.server_port, stop
+
+
+def start_asgi():
+    """Один процесс uvicorn: как gunicorn -k uvicorn.workers.UvicornWorker."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(
+        asgi_application, log_level='warning', lifespan='off',
+        backlog=2048
+    ))
+    thread = threading.Thread(
+        target=server.run, kwargs={'sockets': [sock]}, daemon=True
+    )
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+    return sock.getsockname()[1], stop
+
+
+SERVERS = {'wsgi': start_wsgi, 'asgi': start_asgi}
+
+
+class Command(BaseCommand):
+    """Нагрузка одного процесса сервера параллельными подключениями.
+
+    Клиенты в потоках по кругу запрашивают тэги, поиск продуктов, ленту
+    рецептов и короткую ссылку; медленные клиенты в это время загружают
+    рецепт с картинкой, растягивая отправку тела на --slow-seconds.
+    Для WSGI (синхронный процесс, как сейчас в Dockerfile) и ASGI
+    (uvicorn и backend.asgi) выводятся запросы в секунду, медиана и
+    95-й процентиль времени ответа. Клиенты работают в том же процессе,
+    что и сервер, поэтому абсолютные числа ниже, чем на отдельной машине.
+    """
+
+    help = 'Сравнение пропускной способности WSGI и ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Секунд нагрузки на каждый сервер.'
+        )
+        parser.add_argument('--slow-clients', type=int, default=2)
+        parser.add_argument('--slow-seconds', type=float, default=2.0)
+        parser.add_argument('--recipes', type=int, default=60)
+        parser.add_argument(
+            '--servers', nargs='*', default=list(SERVERS),
+            choices=list(SERVERS)
+        )
+
+    def handle(self, *args, **options):
+        with test_dataset(options['recipes']) as data:
+            paths = [
+                '/api/tags/',
+                f'/api/ingredients/?name={quote("продукт 1")}',
+                '/api/recipes/?limit=6',
+                f'/s/{short_links.encode(data.recipe.pk)}/',
+            ]
+            upload = json.dumps(data.recipe_payload()).encode()
+            self.stdout.write(
+                f'{"сервер":8} {"запросов":>9} {"в с":>7} {"медиана":>9} '
+                f'{"95%":>9} {"ошибок":>7} {"загрузок":>9}'
+            )
+            for name in options['servers']:
+                port, stop = SERVERS[name]()
+                try:
+                    result = self.load(
+                        port, paths, upload, data.token, options
+                    )
+                finally:
+                    stop()
+                self.stdout.write(
+                    f'{name:8} {result["requests"]:>9} '
+                    f'{result["rate"]:>7.0f} {result["median"]:>7.1f}мс '
+                    f'{result["p95"]:>7.1f}мс {result["errors"]:>7} '
+                    f'{result["uploads"]:>9}'
+                )
+
+    def load(self, port, paths, upload, token, options):
+        timings = []
+        errors = []
+        uploads = []
+        stop = threading.Event()
+
+        def get(path):
+            client = HTTPConnection('127.0.0.1', port, timeout=60)
+            try:
+                client.request('GET', path)
+                response = client.getresponse()
+                response.read()
+                return response.status < 400
+            except OSError:
+                return False
+            finally:
+                client.close()
+
+        def fast_client(offset):
+            index = offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                if get(paths[index % len(paths)]):
+                    timings.append(time.perf_counter() - start)
+                else:
+                    errors.append(paths[index % len(paths)])
+                index += 1
+
+        def slow_client():
+            parts = 20
+            size = len(upload) // parts + 1
+            while not stop.is_set():
+                client = HTTPConnection('127.0.0.1', port, timeout=60)
+                try:
+                    client.putrequest('POST', '/api/recipes/')
+                    client.putheader('Content-Type', 'application/json')
+                    client.putheader('Content-Length', str(len(upload)))
+                    client.putheader('Authorization', f'Token {token}')
+                    client.endheaders()
+                    for start in range(0, len(upload), size):
+                        client.send(upload[start:start + size])
+                        time.sleep(options['slow_seconds'] / parts)
+                    response = client.getresponse()
+                    response.read()
+                    uploads.append(response.status)
+                except OSError:
+                    errors.append('upload')
+                finally:
+                    client.close()
+
+        for path in paths:
+            # Прогрев: снимки таблиц и кэши процесса загружаются.
+            get(path)
+        threads = [
+            threading.Thread(target=fast_client, args=(index,))
+            for index in range(options['clients'])
+        ] + [
+            threading.Thread(target=slow_client)
+            for _ in range(options['slow_clients'])
+        ]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': len(timings),
+            'rate': len(timings) / elapsed,
+            'median': statistics.median(timings) * 1000 if timings else 0,
+            'p95': (
+                statistics.quantiles(timings, n=20)[-1] * 1000
+                if len(timings) > 1 else 0
+            ),
+            'errors': len(errors),
+            'uploads': sum(status == 201 for status in uploads),
+        }
@@ -0,0 +1,44 @@
+"""Команда для построения уменьшенных копий картинок."""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from recipes.images import IMAGE_FIELDS, build_variants
+
+
+class Command(BaseCommand):
+    """Строит копии картинок, у которых их ещё нет."""
+
+    help = 'Уменьшенные копии картинок рецептов и аватаров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить копии всех картинок.'
+        )
+
+    def handle(self, *args, **options):
+        for label, (image_field, _) in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            built = 0
+            last_pk = 0
+            while True:
+                pks = list(
+                    model.objects.filter(pk__gt=last_pk).exclude(
+                        **{image_field: ''}
+                    ).exclude(
+                        **{f'{image_field}__isnull': True}
+                    ).order_by('pk').values_list(
+                        'pk', flat=True
+                    )[:options['batch_size']]
+                )
+                if not pks:
+                    break
+                for pk in pks:
+                    build_variants(model, pk, options['force'])
+                built += len(pks)
+                last_pk = pks[-1]
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: '
+                f'проверено картинок {built}.'
+            ))
@@ -0,0 +1,160 @@
+"""Команда для разбора планов частых запросов API."""
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.db.models.query import RawQuerySet
+
+from recipes.models import (
+    FoodgramUser, Ingredient, Recipe, RecipeIngredient, ShoppingListItem,
+    Tag
+)
+
+# Признаки плохого плана: (описание, выражение) для каждой СУБД.
+PLAN_ISSUES = {
+    'sqlite': (
+        ('полный просмотр', re.compile(
+            r'SCAN (?:TABLE )?(\w+)(?! VIRTUAL)(?!.* USING)'
+        )),
+        ('сортировка', re.compile(r'USE TEMP B-TREE FOR (\w+(?: \w+)*)')),
+    ),
+    'postgresql': (
+        ('полный просмотр', re.compile(r'Seq Scan on (\w+)')),
+        ('сортировка', re.compile(r'(?<!Incremental )Sort\b.*?(\(.*)')),
+    ),
+}
+
+
+def get_hot_queries(user, author, tag):
+    """Запросы, которые выполняются на каждой странице API.
+
+    Повторяют запросы представлений: лента и её фильтры, подписки,
+    продукты рецептов, поиск продуктов и список покупок.
+    """
+    feed = Recipe.objects.select_related('author').with_user_flags(user)
+    recipe_ids = list(feed.values_list('pk', flat=True)[:6])
+    author_ids = list(
+        FoodgramUser.objects.filter(
+            authors__subscriber=user
+        ).values_list('pk', flat=True)[:6]
+    )
+    return (
+        ('recipes-feed', feed[:6]),
+        ('recipes-feed-deep-page', feed[600:606]),
+        ('recipes-by-author', feed.filter(author=author)[:6]),
+        ('recipes-by-tag', feed.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=[tag.pk]
+            )
+        ))[:6]),
+        ('recipes-favorited', feed.filter(favorites__user=user)[:6]),
+        ('recipes-in-shopping-cart', feed.filter(
+            shoppingcarts__user=user
+        )[:6]),
+        ('recipes-search', feed.search('суп')[:6]),
+        ('recipe-ingredients', RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).select_related('ingredient')),
+        ('subscriptions', FoodgramUser.objects.filter(
+            authors__subscriber=user
+        )[:6]),
+        ('subscriptions-recipes', Recipe.objects.filter(
+            author_id__in=author_ids
+        ).only(
+            'id', 'author_id', 'name', 'image', 'image_variants',
+            'cooking_time', 'published_at'
+        ).latest_per_author(3)),
+        ('users', FoodgramUser.objects.all()[:6]),
+        ('ingredients-search', Ingredient.objects.filter(
+            name__istartswith='са'
+        )),
+        ('shopping-list', ShoppingListItem.objects.filter(
+            user=user
+        ).select_related('ingredient')),
+    )
+
+
+def query_sql(queryset):
+    if isinstance(queryset, RawQuerySet):
+        return queryset.raw_query, queryset.params
+    return queryset.query.sql_with_params()
+
+
+class Command(BaseCommand):
+    """Показывает планы частых запросов и отмечает проблемные места."""
+
+    help = (
+        'Планы частых запросов (EXPLAIN): полные просмотры таблиц '
+        'и сортировки без индекса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='EXPLAIN ANALYZE (только PostgreSQL).'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--only', nargs='*', default=None,
+            help='Разобрать только перечисленные запросы.'
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Выводить планы целиком.'
+        )
+
+    def handle(self, *args, **options):
+        user = FoodgramUser.objects.order_by('-subscriptions_count').first()
+        author = FoodgramUser.objects.order_by('-recipes_count').first()
+        tag = Tag.objects.order_by('pk').first()
+        if user is None or tag is None:
+            raise CommandError('В базе нет пользователей или тэгов.')
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--analyze работает только в PostgreSQL.')
+            explain_options['analyze'] = True
+        issues_found = 0
+        for name, queryset in get_hot_queries(user, author, tag):
+            if options['only'] and name not in options['only']:
+                continue
+            plan = self.explain(queryset, explain_options)
+            issues = [
+                f'{label}: {match.group(1)}'
+                for label, pattern in PLAN_ISSUES.get(connection.vendor, ())
+                for match in pattern.finditer(plan)
+            ]
+            issues_found += len(issues)
+            self.stdout.write(
+                f'{name:28} {self.measure(queryset, options["repeat"]):>9.2f}'
+                ' мс  ' + (
+                    self.style.WARNING('; '.join(issues)) if issues
+                    else self.style.SUCCESS('ok')
+                )
+            )
+            if options['verbose_plans'] or issues:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+        self.stdout.write(f'Проблемных мест: {issues_found}.')
+
+    def explain(self, queryset, options):
+        sql, params = query_sql(queryset)
+        prefix = connection.ops.explain_query_prefix(**options)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(
+                ' '.join(str(column) for column in row[-1:])
+                for row in cursor.fetchall()
+            )
+
+    @staticmethod
+    def measure(queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset._clone())
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
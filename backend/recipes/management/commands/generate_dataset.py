@@ -0,0 +1,418 @@
+"""Команда для генерации большого набора данных для замеров."""
+import io
+import random
+import time
+from array import array
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from recipes.counters import repair_counters
+from recipes.models import (
+    Favorite, FoodgramUser, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription, Tag
+)
+from recipes.shopping_lists import rebuild
+
+FIRST_NAMES = (
+    'Анна', 'Мария', 'Елена', 'Ольга', 'Иван', 'Пётр', 'Алексей',
+    'Дмитрий', 'Наталья', 'Сергей', 'Татьяна', 'Михаил',
+)
+LAST_NAMES = (
+    'Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов',
+    'Лебедев', 'Козлов', 'Новиков', 'Морозов',
+)
+DISHES = (
+    'пирог с капустой', 'борщ', 'щи', 'блины', 'сырники', 'плов',
+    'пельмени', 'овощное рагу', 'куриный суп', 'гречка с грибами',
+    'салат с тунцом', 'котлеты', 'запеканка', 'омлет', 'солянка',
+    'уха', 'оладьи', 'лазанья', 'ризотто', 'шарлотка',
+)
+STYLES = (
+    'Домашний', 'Быстрый', 'Бабушкин', 'Постный', 'Праздничный',
+    'Летний', 'Острый', 'Сытный', 'Лёгкий', 'Классический',
+)
+SENTENCES = (
+    'Подготовьте продукты и разогрейте духовку.',
+    'Нарежьте овощи небольшими кубиками.',
+    'Обжарьте на среднем огне до золотистого цвета.',
+    'Посолите и поперчите по вкусу.',
+    'Тушите под крышкой, периодически помешивая.',
+    'Подавайте горячим со сметаной и зеленью.',
+    'Дайте настояться несколько минут перед подачей.',
+)
+PLACEHOLDER_COLORS = (
+    '#e07a5f', '#3d405b', '#81b29a', '#f2cc8f', '#6d597a', '#b56576',
+    '#457b9d', '#e9c46a',
+)
+# Рецепты публикуются равномерно за столько дней до запуска команды.
+PUBLISH_DAYS = 730
+
+
+class Zipf:
+    """Выбор элементов с вероятностью, обратной степени их ранга.
+
+    Ранги перемешаны, поэтому популярными оказываются случайные
+    элементы, а не первые по порядку.
+    """
+
+    def __init__(self, items, exponent, rnd):
+        self.items = list(items)
+        rnd.shuffle(self.items)
+        self.weights = []
+        total = 0
+        for rank in range(1, len(self.items) + 1):
+            total += rank ** -exponent
+            self.weights.append(total)
+
+    def choice(self, rnd):
+        return rnd.choices(self.items, cum_weights=self.weights)[0]
+
+    def sample(self, rnd, size, exclude=None):
+        """До size разных элементов; популярные попадаются чаще."""
+        chosen = set()
+        for _ in range(10):
+            if len(chosen) >= size:
+                break
+            chosen.update(rnd.choices(
+                self.items, cum_weights=self.weights, k=size - len(chosen)
+            ))
+            chosen.discard(exclude)
+        return list(chosen)[:size]
+
+
+def placeholder_images(count):
+    """Имена заглушек для картинок рецептов; файлы создаются один раз."""
+    names = []
+    for index in range(count):
+        name = f'media/images/placeholder_{index}.png'
+        if not default_storage.exists(name):
+            color = PLACEHOLDER_COLORS[index % len(PLACEHOLDER_COLORS)]
+            image = Image.new('RGB', (640, 480), color)
+            ImageDraw.Draw(image).ellipse(
+                (200, 120, 440, 360), fill='white'
+            )
+            buffer = io.BytesIO()
+            image.save(buffer, 'PNG')
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
+
+
+def pks_by_index(rows, count):
+    """Первичные ключи по номерам строк из пар (номер, ключ)."""
+    pks = array('l', [0]) * count
+    for index, pk in rows:
+        pks[index] = pk
+    return pks
+
+
+class Command(BaseCommand):
+    """Генерирует воспроизводимый набор данных заданного размера.
+
+    Связи строятся по закону Ципфа: немногие авторы пишут большую часть
+    рецептов и собирают большую часть подписчиков, немногие рецепты
+    чаще других попадают в избранное и корзины. Строки вставляются
+    пачками, счётчики записываются сразу, а списки покупок собираются
+    в конце.
+    """
+
+    help = 'Генерация пользователей, рецептов, избранного, корзин и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число рецептов в избранном у пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее число рецептов в корзине у пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=10,
+            help='Среднее число подписок у пользователя.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа.'
+        )
+        parser.add_argument('--images', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Начало имён пользователей: <prefix><номер>.'
+        )
+        parser.add_argument('--password', default='password')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя.')
+        if FoodgramUser.objects.filter(
+            username=f'{options["prefix"]}0'
+        ).exists():
+            raise CommandError(
+                f'Пользователи {options["prefix"]}* уже есть; укажите '
+                'другой --prefix.'
+            )
+        if not Ingredient.objects.exists() or not Tag.objects.exists():
+            call_command('load_data', stdout=self.stdout)
+        self.options = options
+        self.batch_size = options['batch_size']
+        seed = options['seed']
+        rnd = random.Random(seed)
+        users = range(options['users'])
+        recipes = range(options['recipes'])
+        self.authors = Zipf(users, options['zipf'], rnd)
+        self.popular = Zipf(recipes, options['zipf'], rnd)
+        self.ingredients = Zipf(
+            Ingredient.objects.values_list('pk', flat=True),
+            options['zipf'], rnd
+        )
+        self.tags = Zipf(Tag.objects.values_list('pk', flat=True), 1, rnd)
+        start = time.perf_counter()
+
+        recipe_authors = array('l', (
+            self.authors.choice(rnd) for _ in recipes
+        ))
+        recipes_count = array('l', [0]) * len(users)
+        for author in recipe_authors:
+            recipes_count[author] += 1
+        subscribers_count = array('l', [0]) * len(users)
+        subscriptions_count = array('l', [0]) * len(users)
+        for user, author in self.subscriptions(seed):
+            subscriptions_count[user] += 1
+            subscribers_count[author] += 1
+        favorites_count = array('l', [0]) * len(recipes)
+        for _, recipe in self.favorites(seed):
+            favorites_count[recipe] += 1
+        carts_count = array('l', [0]) * len(recipes)
+        cart_users = set()
+        for user, recipe in self.carts(seed):
+            carts_count[recipe] += 1
+            cart_users.add(user)
+
+        password = make_password(options['password'])
+        self.insert(FoodgramUser, (
+            FoodgramUser(
+                username=f'{options["prefix"]}{index}',
+                email=f'{options["prefix"]}{index}@example.com',
+                first_name=FIRST_NAMES[index % len(FIRST_NAMES)],
+                last_name=LAST_NAMES[index % len(LAST_NAMES)],
+                password=password,
+                recipes_count=recipes_count[index],
+                subscribers_count=subscribers_count[index],
+                subscriptions_count=subscriptions_count[index],
+            ) for index in users
+        ), len(users))
+        user_pks = self.user_pks(len(users))
+
+        images = placeholder_images(options['images'])
+        self.insert(Recipe, (
+            Recipe(
+                author_id=user_pks[recipe_authors[index]],
+                name=self.recipe_name(rnd, index),
+                text=' '.join(rnd.sample(SENTENCES, 3)),
+                cooking_time=max(1, min(
+                    600, int(rnd.lognormvariate(3.4, 0.6))
+                )),
+                image=images[index % len(images)],
+                favorites_count=favorites_count[index],
+                shopping_carts_count=carts_count[index],
+            ) for index in recipes
+        ), len(recipes))
+        recipe_pks = self.recipe_pks(user_pks, len(recipes))
+        self.step('Даты публикации', lambda: self.publish(recipe_pks))
+
+        self.insert_contents(seed, recipe_pks)
+        self.insert(Subscription, (
+            Subscription(
+                subscriber_id=user_pks[user],
+                subscribed_to_id=user_pks[author]
+            ) for user, author in self.subscriptions(seed)
+        ), sum(subscriptions_count))
+        self.insert(Favorite, (
+            Favorite(user_id=user_pks[user], recipe_id=recipe_pks[recipe])
+            for user, recipe in self.favorites(seed)
+        ), sum(favorites_count))
+        self.insert(ShoppingCart, (
+            ShoppingCart(
+                user_id=user_pks[user], recipe_id=recipe_pks[recipe]
+            ) for user, recipe in self.carts(seed)
+        ), sum(carts_count))
+
+        self.step('Счётчики продуктов', lambda: repair_counters(
+            Ingredient, ['recipes_count'], self.batch_size
+        ))
+        cart_user_pks = sorted(user_pks[user] for user in cart_users)
+        self.step('Списки покупок', lambda: [
+            rebuild(cart_user_pks[offset:offset + self.batch_size])
+            for offset in range(0, len(cart_user_pks), self.batch_size)
+        ])
+        self.step('Статистика планировщика', self.analyze)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - start:.1f} с.'
+        ))
+
+    @staticmethod
+    def recipe_name(rnd, index):
+        return f'{rnd.choice(STYLES)} {rnd.choice(DISHES)} {index}'
+
+    def user_pks(self, count):
+        """Ключи новых пользователей по номерам в именах <prefix><номер>.
+
+        bulk_create в SQLite ключи не возвращает, а ключи после прежнего
+        максимума могут достаться чужим строкам; имена же уникальны, и
+        имена с номерами меньше count вставлены этой командой.
+        """
+        prefix = self.options['prefix']
+        names = {f'{prefix}{index}': index for index in range(count)}
+        return pks_by_index((
+            (names[username], pk)
+            for username, pk in FoodgramUser.objects.filter(
+                username__startswith=prefix
+            ).values_list('username', 'pk').iterator(chunk_size=10000)
+            if username in names
+        ), count)
+
+    def recipe_pks(self, user_pks, count):
+        """Ключи новых рецептов по номерам в конце их названий.
+
+        Авторы — только что созданные пользователи, так что все их
+        рецепты вставлены этой командой.
+        """
+        authors = set(user_pks)
+        return pks_by_index((
+            (int(name.rsplit(' ', 1)[1]), pk)
+            for name, author, pk in Recipe.objects.filter(
+                author__username__startswith=self.options['prefix']
+            ).values_list('name', 'author', 'pk').iterator(chunk_size=10000)
+            if author in authors
+        ), count)
+
+    def per_user(self, seed, name, mean, zipf, exclude_self=False):
+        """Пары (пользователь, элемент) связи name.
+
+        Генератор с собственным зерном выдаёт одни и те же пары при
+        каждом проходе: первый считает счётчики, второй вставляет строки.
+        """
+        if not mean:
+            return
+        rnd = random.Random(f'{seed}:{name}')
+        for user in range(self.options['users']):
+            size = int(rnd.expovariate(1 / mean))
+            for item in zipf.sample(
+                rnd, size, exclude=user if exclude_self else None
+            ):
+                yield user, item
+
+    def subscriptions(self, seed):
+        return self.per_user(
+            seed, 'subscriptions', self.options['subscriptions'],
+            self.authors, exclude_self=True
+        )
+
+    def favorites(self, seed):
+        return self.per_user(
+            seed, 'favorites', self.options['favorites'], self.popular
+        )
+
+    def carts(self, seed):
+        return self.per_user(seed, 'carts', self.options['carts'],
+                             self.popular)
+
+    def publish(self, recipe_pks):
+        """Разнести даты публикации рецептов за два года по порядку номеров.
+
+        auto_now_add ставит всем рецептам текущее время; даты меняются
+        запросом UPDATE на каждый диапазон номеров с общей датой, не
+        больше PUBLISH_DAYS запросов.
+        """
+        now = timezone.now()
+        slots = min(len(recipe_pks), PUBLISH_DAYS)
+        for slot in range(slots):
+            first = recipe_pks[len(recipe_pks) * slot // slots]
+            last = recipe_pks[len(recipe_pks) * (slot + 1) // slots - 1]
+            Recipe.objects.filter(pk__range=(first, last)).update(
+                published_at=now - timedelta(days=PUBLISH_DAYS) * (
+                    (slots - slot) / slots
+                )
+            )
+
+    def insert_contents(self, seed, recipe_pks):
+        """Тэги и продукты рецептов: 1–3 тэга и 3–15 продуктов."""
+        rnd = random.Random(f'{seed}:contents')
+        through = Recipe.tags.through
+        tags, ingredients = [], []
+
+        def contents():
+            for recipe_pk in recipe_pks:
+                tags.extend(
+                    through(recipe_id=recipe_pk, tag_id=tag)
+                    for tag in self.tags.sample(rnd, rnd.randint(1, 3))
+                )
+                ingredients.extend(
+                    RecipeIngredient(
+                        recipe_id=recipe_pk, ingredient_id=ingredient,
+                        amount=rnd.choice((1, 2, 5, 10, 50, 100, 200, 500))
+                    ) for ingredient in self.ingredients.sample(
+                        rnd, int(rnd.triangular(3, 15, 7))
+                    )
+                )
+                if len(ingredients) >= self.batch_size:
+                    yield
+            yield
+
+        start = time.perf_counter()
+        total = 0
+        for _ in contents():
+            through.objects.bulk_create(tags)
+            RecipeIngredient.objects.bulk_create(ingredients)
+            total += len(tags) + len(ingredients)
+            tags.clear()
+            ingredients.clear()
+        self.report('Тэги и продукты рецептов', total, start)
+
+    def insert(self, model, objects, total):
+        """Вставить объекты пачками."""
+        start = time.perf_counter()
+        batch = []
+        done = 0
+        for instance in objects:
+            batch.append(instance)
+            if len(batch) == self.batch_size:
+                model.objects.bulk_create(batch)
+                done += len(batch)
+                batch.clear()
+                self.stdout.write(
+                    f'  {model._meta.verbose_name_plural}: '
+                    f'{done}/{total}', ending='\r'
+                )
+        model.objects.bulk_create(batch)
+        self.report(model._meta.verbose_name_plural, total, start)
+
+    def step(self, title, action):
+        start = time.perf_counter()
+        action()
+        self.stdout.write(f'{title}: {time.perf_counter() - start:.1f} с')
+
+    def report(self, title, total, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{title}: {total} строк за {elapsed:.1f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+
+    @staticmethod
+    def analyze():
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,246 @@
+"""Команда для загрузки справочников продуктов и тэгов."""
+import csv
+import io
+import json
+import os
+import re
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import slug_re
+from django.db import connection, transaction
+
+from recipes.constants import MAX_NAME_LENGTH
+from recipes.models import Ingredient, Tag
+
+# Справочник: модель, поля в порядке столбцов CSV и поля ключа строки.
+# Поля вне ключа у существующих строк обновляются.
+REFERENCES = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit'),
+                    ('name', 'measurement_unit')),
+    'tags': (Tag, ('name', 'slug'), ('slug',)),
+}
+DEFAULT_FILES = ('ingredients.csv', 'tags.json')
+# Пробелы и запятая между объектами JSON-массива.
+SEPARATORS = re.compile(r'\s*,?\s*')
+
+
+def read_csv(file, fields):
+    """Строки CSV; первая строка пропускается, если это заголовок."""
+    reader = csv.reader(file)
+    for row in reader:
+        if reader.line_num == 1 and tuple(row) == fields:
+            continue
+        yield dict(zip(fields, row)) if len(row) == len(fields) else row
+
+
+def read_json(file, buffer_size=64 * 1024):
+    """Объекты JSON-массива по одному, без чтения файла целиком.
+
+    Разбор идёт со смещения в буфере; разобранное отрезается только при
+    дочитывании файла. Если объект не уместился в буфер, следующая порция
+    читается вдвое больше, чтобы длинный объект разбирался заново не
+    больше логарифма от своей длины раз.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(buffer_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив объектов.')
+    position, size = 1, buffer_size
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(size)
+            if not chunk:
+                raise CommandError('JSON-массив оборван.')
+            buffer, position, size = buffer[position:] + chunk, 0, size * 2
+            continue
+        size = buffer_size
+        yield item
+
+
+def read_rows(path, fields):
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.endswith('.json'):
+            yield from read_json(file)
+        else:
+            yield from read_csv(file, fields)
+
+
+def validate(rows, fields, start):
+    """Проверить пачку строк: вернуть верные строки и список ошибок."""
+    valid, errors = [], []
+    for number, row in enumerate(rows, start):
+        if not isinstance(row, dict) or set(fields) - set(row):
+            errors.append(f'строка {number}: ожидались поля {fields}')
+            continue
+        row = {field: str(row[field]).strip() for field in fields}
+        if not all(row.values()):
+            errors.append(f'строка {number}: пустое значение')
+        elif any(len(value) > MAX_NAME_LENGTH for value in row.values()):
+            errors.append(
+                f'строка {number}: значение длиннее {MAX_NAME_LENGTH}'
+            )
+        elif 'slug' in row and not slug_re.match(row['slug']):
+            errors.append(f'строка {number}: неверный слаг {row["slug"]}')
+        else:
+            valid.append(row)
+    return valid, errors
+
+
+def copy_missing(model, fields, rows):
+    """Вставить строки через COPY во временную таблицу (PostgreSQL).
+
+    Остальные поля получают значения по умолчанию модели, а конфликты
+    с параллельной загрузкой пропускаются.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = [model._meta.get_field(field).column for field in fields]
+    blank = model()
+    extra = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in fields
+    ]
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [row[field] for field in fields] for row in rows
+    )
+    buffer.seek(0)
+    names = ', '.join(connection.ops.quote_name(name) for name in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE load_rows ON COMMIT DROP AS '
+            f'SELECT {names} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY load_rows ({names}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({names}, ' + ', '.join(
+                connection.ops.quote_name(field.column) for field in extra
+            ) + f') SELECT {names}, ' + ', '.join(['%s'] * len(extra))
+            + ' FROM load_rows ON CONFLICT DO NOTHING',
+            [
+                field.get_db_prep_save(
+                    field.pre_save(blank, add=True), connection
+                ) for field in extra
+            ]
+        )
+        # ON COMMIT DROP не срабатывает, пока внешняя транзакция открыта.
+        cursor.execute('DROP TABLE load_rows')
+
+
+class Command(BaseCommand):
+    """Загружает продукты и тэги из CSV и JSON пачками.
+
+    Повторная загрузка ничего не меняет: в базу пишутся только новые
+    строки и строки, у которых изменились поля вне ключа.
+    """
+
+    help = (
+        'Загрузка справочников из CSV/JSON. Без аргументов загружаются '
+        f'{", ".join(DEFAULT_FILES)} из папки data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='Файлы; справочник определяется по имени файла.'
+        )
+        parser.add_argument(
+            '--model', choices=REFERENCES,
+            help='Справочник для всех перечисленных файлов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        files = options['files'] or [
+            os.path.join(settings.BASE_DIR, 'data', name)
+            for name in DEFAULT_FILES
+        ]
+        for path in files:
+            reference = options['model'] or os.path.basename(
+                path
+            ).split('.')[0]
+            if reference not in REFERENCES:
+                raise CommandError(
+                    f'{path}: укажите справочник через --model '
+                    f'({", ".join(REFERENCES)}).'
+                )
+            if not os.path.exists(path):
+                raise CommandError(f'Файл {path} не найден.')
+            self.load(path, *REFERENCES[reference], options['batch_size'])
+
+    def load(self, path, model, fields, key, batch_size):
+        start = time.perf_counter()
+        rows = read_rows(path, fields)
+        count_before = model.objects.count()
+        total = updated = 0
+        errors = []
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            valid, batch_errors = validate(batch, fields, total + 1)
+            errors += batch_errors
+            total += len(batch)
+            updated += self.upsert(model, fields, key, valid)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {total} строк, '
+                f'{total / (time.perf_counter() - start):.0f} строк/с'
+            )
+        for error in errors[:20]:
+            self.stderr.write(f'{path}: {error}')
+        created = model.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'{path}: {total} строк за '
+            f'{time.perf_counter() - start:.2f} с; добавлено {created}, '
+            f'обновлено {updated}, с ошибками {len(errors)}.'
+        ))
+
+    @staticmethod
+    def upsert(model, fields, key, rows):
+        """Записать новые и изменившиеся строки пачки.
+
+        Возвращает число обновлённых строк. Обновления идут через save(),
+        чтобы сработали сигналы сброса кэшей: меняются единичные строки.
+        """
+        rows = {tuple(row[field] for field in key): row for row in rows}
+        existing = {
+            tuple(getattr(instance, field) for field in key): instance
+            for instance in model.objects.filter(**{
+                f'{key[0]}__in': {row_key[0] for row_key in rows}
+            })
+        }
+        missing = [
+            row for row_key, row in rows.items() if row_key not in existing
+        ]
+        changed = [
+            (existing[row_key], row) for row_key, row in rows.items()
+            if row_key in existing and any(
+                getattr(existing[row_key], field) != row[field]
+                for field in fields
+            )
+        ]
+        update_fields = list(fields) + [
+            field.name for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        with transaction.atomic():
+            if missing and connection.vendor == 'postgresql':
+                copy_missing(model, fields, missing)
+            elif missing:
+                model.objects.bulk_create(
+                    (model(**row) for row in missing), ignore_conflicts=True
+                )
+            for instance, row in changed:
+                for field in fields:
+                    setattr(instance, field, row[field])
+                instance.save(update_fields=update_fields)
+        return len(changed)
@@ -0,0 +1,66 @@
+"""Команда для загрузки рецептов из JSON-выгрузки."""
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import create_recipes
+from recipes.images import wait_for_variants
+from recipes.models import FoodgramUser
+
+from .load_data import read_json
+
+
+class Command(BaseCommand):
+    """Создаёт рецепты из JSON-массива в формате POST /api/recipes/.
+
+    Рецепты проверяются и вставляются пачками, как в
+    POST /api/recipes/bulk/; рецепты с ошибками пропускаются.
+    """
+
+    help = 'Загрузка рецептов из JSON-массива в формате API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='JSON-файл с массивом рецептов.')
+        parser.add_argument(
+            '--author', required=True, help='Email автора рецептов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        author = FoodgramUser.objects.filter(email=options['author']).first()
+        if author is None:
+            raise CommandError(f'Пользователь {options["author"]} не найден.')
+        start = time.perf_counter()
+        total = created = 0
+        try:
+            with open(options['file'], encoding='utf-8') as file:
+                items = read_json(file)
+                while True:
+                    batch = list(islice(items, options['batch_size']))
+                    if not batch:
+                        break
+                    for number, (recipe, errors) in enumerate(
+                        create_recipes(batch, author), total + 1
+                    ):
+                        if errors:
+                            self.stderr.write(
+                                f'рецепт {number}: '
+                                + json.dumps(errors, ensure_ascii=False)
+                            )
+                        else:
+                            created += 1
+                    total += len(batch)
+                    self.stdout.write(
+                        f'рецепты: {total}, '
+                        f'{total / (time.perf_counter() - start):.0f} в с'
+                    )
+        except FileNotFoundError:
+            raise CommandError(f'Файл {options["file"]} не найден.')
+        wait_for_variants()
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["file"]}: {total} рецептов за '
+            f'{time.perf_counter() - start:.2f} с; создано {created}, '
+            f'с ошибками {total - created}.'
+        ))
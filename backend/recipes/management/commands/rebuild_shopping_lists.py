@@ -0,0 +1,19 @@
+"""Команда для пересборки агрегированных списков покупок."""
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_lists import rebuild_all
+
+
+class Command(BaseCommand):
+    """Пересобирает списки покупок из корзин пачками пользователей."""
+
+    help = 'Пересборка списков покупок из корзин пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        users = rebuild_all(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны для {users} пользователей.'
+        ))
@@ -0,0 +1,33 @@
+"""Команда для пересчёта денормализованных счётчиков."""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from recipes.counters import COUNTERS, repair_counters
+
+
+class Command(BaseCommand):
+    """Пересчитывает счётчики пачками и исправляет расхождения."""
+
+    help = 'Пересчёт счётчиков избранного, рецептов и подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число расхождений.'
+        )
+
+    def handle(self, *args, **options):
+        fields = defaultdict(list)
+        for model, field, _, _ in COUNTERS:
+            fields[model].append(field)
+        for model, model_fields in fields.items():
+            repaired = repair_counters(
+                model, model_fields, options['batch_size'],
+                options['dry_run']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: '
+                f'расхождений {repaired}.'
+            ))
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.16 on 2026-10-18 08:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+COUNTERS = (
+    ('Recipe', 'favorites_count', 'Favorite', 'recipe'),
+    ('Recipe', 'shopping_carts_count', 'ShoppingCart', 'recipe'),
+    ('FoodgramUser', 'recipes_count', 'Recipe', 'author'),
+    ('FoodgramUser', 'subscribers_count', 'Subscription', 'subscribed_to'),
+    ('FoodgramUser', 'subscriptions_count', 'Subscription', 'subscriber'),
+    ('Ingredient', 'recipes_count', 'RecipeIngredient', 'ingredient'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model_name, field, counted_name, key in COUNTERS:
+        model = apps.get_model('recipes', model_name)
+        counted = apps.get_model('recipes', counted_name)
+        model.objects.update(**{field: Coalesce(
+            Subquery(
+                counted.objects.filter(**{key: OuterRef('pk')})
+                .order_by()
+                .values(key)
+                .annotate(total=Count('pk'))
+                .values('total')
+            ),
+            Value(0)
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_published_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число рецептов'),
+        ),
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='subscriptions_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число подписок'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число рецептов'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2026-10-18 08:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F, Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    recipe_ingredient = apps.get_model('recipes', 'RecipeIngredient')
+    item = apps.get_model('recipes', 'ShoppingListItem')
+    item.objects.bulk_create(
+        (
+            item(
+                user_id=row['user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total'],
+                recipes_count=row['recipes'],
+            )
+            for row in recipe_ingredient.objects.filter(
+                recipe__shoppingcarts__isnull=False
+            ).order_by().values(
+                'ingredient_id',
+                user_id=F('recipe__shoppingcarts__user_id'),
+            ).annotate(total=Sum('amount'), recipes=Count('recipe_id'))
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_tag_ingredient_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Число рецептов')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Продукт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Продукт в списке покупок',
+                'verbose_name_plural': 'Списки покупок',
+                'default_related_name': 'shopping_list_items',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
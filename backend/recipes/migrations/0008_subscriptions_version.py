@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='subscriptions_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия подписок'),
+        ),
+    ]
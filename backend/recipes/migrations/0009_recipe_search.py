@@ -0,0 +1,98 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    """
+    ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipe USING GIN (search_vector)
+    """,
+)
+
+POSTGRESQL_BACKWARD = (
+    'ALTER TABLE recipes_recipe DROP COLUMN search_vector',
+)
+
+SQLITE_FORWARD = (
+    """
+    CREATE VIRTUAL TABLE recipes_recipe_search USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_search (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_search
+            (recipes_recipe_search, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_search
+            (recipes_recipe_search, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipe_search (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    """
+    INSERT INTO recipes_recipe_search (recipes_recipe_search)
+    VALUES ('rebuild')
+    """,
+)
+
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_update',
+    'DROP TABLE recipes_recipe_search',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+    """Полнотекстовый поиск рецептов.
+
+    В PostgreSQL — вычисляемый столбец tsvector с русской морфологией и
+    GIN-индекс, в SQLite — таблица FTS5, которую поддерживают триггеры.
+    Модель о них не знает: запросы строит RecipeQuerySet.search.
+    """
+
+    dependencies = [
+        ('recipes', '0008_subscriptions_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({
+                'postgresql': POSTGRESQL_FORWARD,
+                'sqlite': SQLITE_FORWARD,
+            }),
+            run({
+                'postgresql': POSTGRESQL_BACKWARD,
+                'sqlite': SQLITE_BACKWARD,
+            }),
+        ),
+    ]
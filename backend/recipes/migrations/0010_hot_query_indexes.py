@@ -0,0 +1,55 @@
+# Generated by Django 3.2.16 on 2026-10-18 09:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Поиск продуктов по началу названия без учёта регистра (istartswith):
+# в PostgreSQL это UPPER(name) LIKE UPPER(%s), в SQLite — LIKE, который
+# использует индекс только с правилом сравнения NOCASE.
+INGREDIENT_NAME_INDEX = {
+    'postgresql': (
+        'CREATE INDEX ingredient_name_upper_idx ON recipes_ingredient '
+        '(UPPER(name) varchar_pattern_ops)',
+        'DROP INDEX ingredient_name_upper_idx',
+    ),
+    'sqlite': (
+        'CREATE INDEX ingredient_name_nocase_idx ON recipes_ingredient '
+        '(name COLLATE NOCASE)',
+        'DROP INDEX ingredient_name_nocase_idx',
+    ),
+}
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    statements = INGREDIENT_NAME_INDEX.get(schema_editor.connection.vendor)
+    if statements:
+        schema_editor.execute(statements[0])
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    statements = INGREDIENT_NAME_INDEX.get(schema_editor.connection.vendor)
+    if statements:
+        schema_editor.execute(statements[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-published_at', '-id'], name='recipe_author_published_idx'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
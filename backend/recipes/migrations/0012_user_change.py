@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.PositiveBigIntegerField(verbose_name='Пользователь')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Изменён')),
+            ],
+            options={
+                'verbose_name': 'Изменение пользователя',
+                'verbose_name_plural': 'Изменения пользователей',
+            },
+        ),
+    ]
@@ -1,6 +1,13 @@
+import re
+
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVectorField
+)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.shortcuts import reverse
 
 from .constants import (
@@ -45,6 +52,31 @@ class FoodgramUser(AbstractUser):
         default=None,
         verbose_name='Изображение пользователя'
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Уменьшенные копии аватара',
+        default=dict,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0,
+        editable=False
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0,
+        editable=False
+    )
+    subscriptions_version = models.PositiveIntegerField(
+        verbose_name='Версия подписок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('username',)
@@ -66,6 +98,10 @@ class Tag(models.Model):
         max_length=MAX_NAME_LENGTH,
         unique=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Изменён',
+        auto_now=True
+    )
 
     class Meta:
         ordering = ('name',)
@@ -92,6 +128,15 @@ class Ingredient(models.Model):
         max_length=MAX_NAME_LENGTH,
         verbose_name='Единица измерения',
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов',
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Изменён',
+        auto_now=True
+    )
 
     class Meta:
         ordering = ('name',)
@@ -109,11 +154,156 @@ class Ingredient(models.Model):
         return f'{self.name[:TEXT_LIMIT]} {self.measurement_unit}'
 
 
+# Буквы, которые отрезаются от слов поискового запроса в SQLite.
+RUSSIAN_ENDINGS = 'аеёиоуыэюяйь'
+
+
+class TableColumn(models.Expression):
+    """Столбец основной таблицы запроса, которого нет среди полей модели."""
+
+    def __init__(self, column, output_field):
+        super().__init__(output_field=output_field)
+        self.column = column
+
+    def resolve_expression(self, query=None, *args, **kwargs):
+        expression = self.copy()
+        expression.alias = query.get_initial_alias()
+        return expression
+
+    def as_sql(self, compiler, connection):
+        return '{}.{}'.format(
+            compiler.quote_name_unless_alias(self.alias),
+            connection.ops.quote_name(self.column)
+        ), []
+
+
+class FullTextRank(models.Func):
+    """Вес рецепта в таблице FTS5 SQLite: название весит больше описания.
+
+    Для рецепта, которого нет среди найденных, — NULL.
+    """
+
+    output_field = models.FloatField()
+
+    def __init__(self, table, match):
+        super().__init__(models.F('pk'))
+        self.table, self.match = table, match
+
+    def as_sql(self, compiler, connection):
+        pk, params = compiler.compile(self.source_expressions[0])
+        return (
+            f'(SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND {self.table}.rowid = {pk})',
+            [self.match, *params]
+        )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов с подготовкой данных для сериализации."""
+
+    prefetch_lookups = ('tags', 'recipe_ingredients__ingredient')
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            *self.prefetch_lookups
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+        )
+
+    def search(self, text):
+        """Рецепты по поисковой строке, самые релевантные первыми.
+
+        Название весит больше описания. Столбец search_vector и таблица
+        recipes_recipe_search создаются миграцией 0009_recipe_search,
+        её триггеры восстанавливает recipes.search. В SQLite нет русской
+        морфологии, поэтому слова без окончаний ищутся по началу.
+        """
+        words = re.findall(r'\w+', text)
+        if not words:
+            return self
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(
+                text, config='russian', search_type='websearch'
+            )
+            recipes = self.alias(
+                search_vector=TableColumn('search_vector', SearchVectorField())
+            ).filter(search_vector=query).annotate(
+                search_rank=SearchRank(models.F('search_vector'), query)
+            )
+        elif connection.vendor == 'sqlite':
+            table = connection.ops.quote_name(
+                f'{self.model._meta.db_table}_search'
+            )
+            match = ' '.join(
+                '"{}"*'.format(word.rstrip(RUSSIAN_ENDINGS) or word)
+                for word in words
+            )
+            recipes = self.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (match,)
+            )).annotate(search_rank=FullTextRank(table, match))
+        else:
+            return self.filter(
+                models.Q(name__icontains=text)
+                | models.Q(text__icontains=text)
+            )
+        return recipes.order_by('-search_rank', '-published_at', '-id')
+
+    def latest_per_author(self, limit=None):
+        """Последние limit рецептов каждого автора одним запросом.
+
+        Место рецепта у автора считает оконная функция ROW_NUMBER, а
+        отфильтровать по ней можно только во внешнем запросе.
+        """
+        if limit is None:
+            return self.order_by('author_id', '-published_at', '-id')
+        ranked = self.order_by().annotate(
+            author_position=models.Window(
+                expression=RowNumber(),
+                partition_by=[models.F('author_id')],
+                order_by=[
+                    models.F('published_at').desc(),
+                    models.F('id').desc(),
+                ],
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            'WHERE author_position <= %s '
+            'ORDER BY author_id, author_position',
+            (*params, limit)
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         FoodgramUser,
         verbose_name='Автор',
         on_delete=models.CASCADE,
+        # Поиск по автору идёт по recipe_author_published_idx.
+        db_index=False,
     )
     name = models.CharField(
         max_length=MAX_NAME_LENGTH,
@@ -139,15 +329,46 @@ class Recipe(models.Model):
         upload_to='media/images/',
         default=None,
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        editable=False
+    )
     published_at = models.DateTimeField(
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Изменён',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-published_at',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
+        indexes = (
+            models.Index(
+                fields=('-published_at', '-id'),
+                name='recipe_published_at_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-published_at', '-id'),
+                name='recipe_author_published_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name[:TEXT_LIMIT]
@@ -252,3 +473,61 @@ class ShoppingCart(UserRecipeModel):
     class Meta(UserRecipeModel.Meta):
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
+
+
+class ShoppingListItem(models.Model):
+    """Сумма продукта по всем рецептам в корзине пользователя."""
+    user = models.ForeignKey(
+        FoodgramUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Продукт'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+        default=0
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов',
+        default=0
+    )
+
+    class Meta:
+        default_related_name = 'shopping_list_items'
+        verbose_name = 'Продукт в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+
+class UserChange(models.Model):
+    """Изменение пользователя, его токенов или подписок.
+
+    По этому журналу процессы сбрасывают пользователей, закэшированных
+    при проверке токена. Id пользователя хранится без внешнего ключа:
+    запись об удалении переживает самого пользователя.
+    """
+    user_id = models.PositiveBigIntegerField(verbose_name='Пользователь')
+    changed_at = models.DateTimeField(
+        verbose_name='Изменён',
+        auto_now_add=True,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Изменение пользователя'
+        verbose_name_plural = 'Изменения пользователей'
+
+    def __str__(self):
+        return f'{self.user_id} {self.changed_at}'
@@ -0,0 +1,45 @@
+"""Триггеры индекса FTS5 для поиска рецептов в SQLite.
+
+Индекс recipes_recipe_search (миграция 0009_recipe_search) обновляют
+триггеры на recipes_recipe. Миграции, меняющие столбцы, в SQLite
+пересоздают таблицу, и триггеры пропадают вместе со старой таблицей.
+Поэтому после каждого migrate недостающие триггеры создаются заново.
+"""
+from importlib import import_module
+
+from django.db import connections
+
+recipe_search = import_module('recipes.migrations.0009_recipe_search')
+
+TABLE = 'recipes_recipe_search'
+TRIGGERS = (
+    'recipes_recipe_search_insert',
+    'recipes_recipe_search_delete',
+    'recipes_recipe_search_update',
+)
+
+
+def restore_triggers(using='default'):
+    """Создать недостающие триггеры и перестроить индекс.
+
+    Возвращает True, если триггеры пришлось создавать.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type = 'table' AND name = %s "
+            "OR type = 'trigger' AND tbl_name = 'recipes_recipe'",
+            [TABLE]
+        )
+        found = {name for _, name in cursor.fetchall()}
+        if TABLE not in found or found.issuperset(TRIGGERS):
+            return False
+        for trigger in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        # Триггеры и перестроение индекса — всё, кроме создания таблицы.
+        for statement in recipe_search.SQLITE_FORWARD[1:]:
+            cursor.execute(statement)
+    return True
@@ -0,0 +1,148 @@
+"""Агрегированные списки покупок пользователей."""
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import (
+    FoodgramUser, RecipeIngredient, ShoppingCart, ShoppingListItem
+)
+
+
+def apply_deltas(user_ids, deltas):
+    """Изменить списки покупок пользователей.
+
+    deltas: {id продукта: (изменение количества, изменение числа
+    рецептов)}. Недостающие строки создаются, строки без рецептов
+    удаляются; всё изменение — не больше трёх запросов.
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not deltas:
+        return
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, (_, recipes) in deltas.items()
+            if recipes > 0
+        ),
+        ignore_conflicts=True,
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+
+    def change(field, position):
+        return Greatest(
+            F(field) + Case(
+                *(
+                    When(ingredient_id=pk, then=Value(delta[position]))
+                    for pk, delta in deltas.items()
+                ),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            Value(0)
+        )
+
+    items.update(
+        amount=change('amount', 0),
+        recipes_count=change('recipes_count', 1),
+    )
+    if any(recipes < 0 for _, recipes in deltas.values()):
+        items.filter(recipes_count=0).delete()
+
+
+def recipes_deltas(recipe_ids, sign):
+    """Изменение списка при добавлении (sign=1) или удалении рецептов."""
+    deltas = {}
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        total, recipes = deltas.get(ingredient_id, (0, 0))
+        deltas[ingredient_id] = (total + sign * amount, recipes + sign)
+    return deltas
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_deltas([user_id], recipes_deltas(recipe_ids, 1))
+
+
+def remove_recipes(user_id, recipe_ids):
+    apply_deltas([user_id], recipes_deltas(recipe_ids, -1))
+
+
+def add_recipe(user_id, recipe_id):
+    add_recipes(user_id, [recipe_id])
+
+
+def remove_recipe(user_id, recipe_id):
+    remove_recipes(user_id, [recipe_id])
+
+
+def change_recipe_ingredients(recipe_id, old, new):
+    """Перенести правку продуктов рецепта в списки всех, у кого он в корзине.
+
+    old и new: {id продукта: количество} до и после правки.
+    """
+    deltas = {}
+    for ingredient_id in old.keys() | new.keys():
+        if ingredient_id not in new:
+            deltas[ingredient_id] = (-old[ingredient_id], -1)
+        elif ingredient_id not in old:
+            deltas[ingredient_id] = (new[ingredient_id], 1)
+        elif old[ingredient_id] != new[ingredient_id]:
+            deltas[ingredient_id] = (
+                new[ingredient_id] - old[ingredient_id], 0
+            )
+    if deltas:
+        apply_deltas(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True),
+            deltas
+        )
+
+
+def rebuild(user_ids):
+    """Пересобрать списки покупок пользователей из их корзин."""
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(
+                user_id=row['user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total'],
+                recipes_count=row['recipes'],
+            )
+            for row in RecipeIngredient.objects.filter(
+                recipe__shoppingcarts__user_id__in=user_ids
+            ).order_by().values(
+                'ingredient_id',
+                user_id=F('recipe__shoppingcarts__user_id'),
+            ).annotate(total=Sum('amount'), recipes=Count('recipe_id'))
+        )
+
+
+def rebuild_for_recipe(recipe_id):
+    rebuild(list(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+    ))
+
+
+def rebuild_all(batch_size):
+    """Пересобрать все списки пачками пользователей. Возвращает их число."""
+    total = 0
+    last_pk = 0
+    while True:
+        user_ids = list(
+            FoodgramUser.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return total
+        rebuild(user_ids)
+        total += len(user_ids)
+        last_pk = user_ids[-1]
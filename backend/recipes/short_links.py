@@ -0,0 +1,41 @@
+"""Короткие коды рецептов для ссылок /s/<код>/.
+
+Код — id рецепта в base62, первый символ которого всегда буква: так коды
+не совпадают со старыми ссылками /s/<id>/ из одних цифр, и те работают
+как прежде. Коды кодируются и декодируются без обращения к базе.
+"""
+import string
+
+from .constants import MAX_PK_VALUE
+
+DIGITS = string.digits + string.ascii_letters
+LETTERS = string.ascii_letters
+MAX_CODE_LENGTH = len(str(MAX_PK_VALUE))
+
+
+def encode(pk):
+    pk, head = divmod(pk, len(LETTERS))
+    tail = ''
+    while pk:
+        pk, digit = divmod(pk, len(DIGITS))
+        tail = DIGITS[digit] + tail
+    return LETTERS[head] + tail
+
+
+def decode(code):
+    """id рецепта по коду или старой ссылке из цифр; None, если код неверен."""
+    if not code or len(code) > MAX_CODE_LENGTH or not code.isascii():
+        return None
+    if code.isdigit():
+        pk = int(code)
+    elif code[0] not in LETTERS or code[1:2] == '0':
+        return None
+    else:
+        pk = 0
+        for char in code[1:]:
+            digit = DIGITS.find(char)
+            if digit < 0:
+                return None
+            pk = pk * len(DIGITS) + digit
+        pk = pk * len(LETTERS) + LETTERS.index(code[0])
+    return pk if 0 < pk <= MAX_PK_VALUE else None
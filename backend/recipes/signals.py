@@ -0,0 +1,60 @@
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from . import search, shopping_lists
+from .counters import COUNTED_MODELS, change_counters
+from .images import IMAGE_FIELDS, needs_variants, schedule_variants
+from .models import FoodgramUser, ShoppingCart, Subscription
+
+
+def increase_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_counters(sender, [instance], 1)
+
+
+def decrease_counters(sender, instance, **kwargs):
+    change_counters(sender, [instance], -1)
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(increase_counters, sender=model)
+    post_delete.connect(decrease_counters, sender=model)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        shopping_lists.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    # До удаления: при удалении рецепта его продукты ещё на месте.
+    shopping_lists.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def change_subscriptions_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        FoodgramUser.objects.filter(pk=instance.subscriber_id).update(
+            subscriptions_version=F('subscriptions_version') + 1
+        )
+
+
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw and needs_variants(instance):
+        schedule_variants(instance)
+
+
+for model in IMAGE_FIELDS:
+    post_save.connect(build_image_variants, sender=model)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'recipes':
+        search.restore_triggers(using)
@@ -5,7 +5,7 @@ from .views import get_recipe_by_short_link
 
 urlpatterns = [
     path(
-        '<int:pk>/',
+        '<str:code>/',
         get_recipe_by_short_link,
         name='shortlink'
     )
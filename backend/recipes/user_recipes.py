@@ -0,0 +1,79 @@
+"""Добавление и удаление пачки рецептов в избранном и корзине."""
+from django.db import IntegrityError, transaction
+
+from . import shopping_lists
+from .counters import change_counters, delete_counted
+from .models import Recipe, ShoppingCart
+
+ADDED = 'added'
+EXISTS = 'exists'
+NOT_FOUND = 'not_found'
+DELETED = 'deleted'
+ABSENT = 'absent'
+# Попыток вставки, если строки пачки параллельно вставил другой запрос.
+INSERT_ATTEMPTS = 3
+
+
+def add_recipes(model, user, recipe_ids):
+    """Добавить рецепты в избранное или корзину (model) пользователя.
+
+    Возвращает {id рецепта: ADDED, EXISTS или NOT_FOUND}. Новые строки
+    вставляются одним запросом; счётчики и список покупок меняются в той
+    же транзакции. Если строку параллельно вставил другой запрос, пачка
+    перечитывается заново, чтобы счётчики не разошлись.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    for _ in range(INSERT_ATTEMPTS - 1):
+        try:
+            with transaction.atomic():
+                return insert_missing(model, user, recipe_ids)
+        except IntegrityError:
+            pass
+    with transaction.atomic():
+        return insert_missing(model, user, recipe_ids)
+
+
+def insert_missing(model, user, recipe_ids):
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', flat=True)
+    )
+    existing = set(
+        model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list('recipe_id', flat=True)
+    )
+    added = [pk for pk in recipe_ids if pk in found and pk not in existing]
+    if added:
+        rows = model.objects.bulk_create(
+            model(user=user, recipe_id=pk) for pk in added
+        )
+        change_counters(model, rows, 1)
+        if model is ShoppingCart:
+            shopping_lists.add_recipes(user.pk, added)
+    return {
+        pk: NOT_FOUND if pk not in found
+        else EXISTS if pk in existing else ADDED
+        for pk in recipe_ids
+    }
+
+
+def remove_recipes(model, user, recipe_ids):
+    """Убрать рецепты из избранного или корзины (model) пользователя.
+
+    Возвращает {id рецепта: DELETED или ABSENT}. Строки удаляются одним
+    запросом, без сигналов на каждую строку.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update().filter(
+                user=user, recipe_id__in=recipe_ids
+            )
+        )
+        removed = {row.recipe_id for row in rows}
+        if rows:
+            if model is ShoppingCart:
+                # До удаления, как и сигнал pre_delete для одной строки.
+                shopping_lists.remove_recipes(user.pk, removed)
+            delete_counted(model, rows)
+    return {pk: DELETED if pk in removed else ABSENT for pk in recipe_ids}
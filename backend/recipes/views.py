@@ -1,17 +1,50 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.conf import settings
+from django.http import Http404, HttpResponseNotAllowed
+from django.shortcuts import redirect
 from django.urls import reverse
-from rest_framework.decorators import api_view
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
 
-from .models import Recipe
+from api.async_views import offload
+from api.cache import recipe_ids
+from .short_links import decode
 
 
-@api_view(['GET'])
-def get_recipe_by_short_link(request, pk=None):
-    recipe = get_object_or_404(Recipe, id=pk)
-    full_api_url = request.build_absolute_uri(
-        reverse(
-            'recipes-detail',
-            args=[recipe.id]
-        )
+def short_link_redirect(request, pk):
+    response = redirect(
+        request.build_absolute_uri(reverse('recipes-detail', args=[pk]))
     )
-    return redirect(full_api_url)
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_MAX_AGE
+    )
+    return response
+
+
+@require_GET
+def get_recipe_by_short_link(request, code):
+    """Переход по короткой ссылке без запросов к базе.
+
+    Код декодируется на месте, а существование рецепта проверяется по
+    карте id в памяти процесса. Переход кэшируется клиентами и прокси.
+    """
+    pk = decode(code)
+    if pk is None or not recipe_ids.exists(pk):
+        raise Http404
+    return short_link_redirect(request, pk)
+
+
+async def get_recipe_by_short_link_async(request, code):
+    """Переход по короткой ссылке для ASGI.
+
+    Карта id читается в цикле событий; сверка карты с таблицей и проверка
+    id, которого в ней нет, идут в пуле потоков.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    pk = decode(code)
+    if pk is None:
+        raise Http404
+    if not (recipe_ids.is_fresh() and recipe_ids.in_snapshot(pk)):
+        if not await offload(recipe_ids.exists)(pk):
+            raise Http404
+    return short_link_redirect(request, pk)